@@ -0,0 +1,205 @@
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.orm import Session, selectinload
+
+from app.documents import (
+    diff_campuses, diff_faculties, document_rows, fingerprint, program_rows, school_to_document,
+)
+from app.models import Campus, Faculty, Program, School
+
+# Rows per executemany() / IN (...) batch
+DEFAULT_BATCH_SIZE = 1000
+
+
+# ============= CORE BULK STATEMENTS =============
+
+def insert_batched(conn, table, rows: list, batch_size: int):
+    """executemany() inserts in fixed-size batches"""
+    for start in range(0, len(rows), batch_size):
+        conn.execute(table.insert(), rows[start:start + batch_size])
+
+
+def delete_schools(conn, school_ids: list, batch_size: int):
+    """Delete schools and their children with one IN (...) statement per batch and table"""
+    for start in range(0, len(school_ids), batch_size):
+        batch = school_ids[start:start + batch_size]
+        conn.execute(delete(Program.__table__).where(Program.__table__.c.school_id.in_(batch)))
+        conn.execute(delete(Faculty.__table__).where(Faculty.__table__.c.school_id.in_(batch)))
+        conn.execute(delete(Campus.__table__).where(Campus.__table__.c.school_id.in_(batch)))
+        conn.execute(delete(School.__table__).where(School.__table__.c.id.in_(batch)))
+
+
+def insert_documents(conn, documents: list, batch_size: int):
+    """Bulk insert documents; returns (schools, campuses, faculties) counts"""
+    school_rows, campus_rows, faculty_rows = [], [], []
+    for doc in documents:
+        school_row, campuses, faculties = document_rows(doc)
+        school_rows.append(school_row)
+        campus_rows.extend(campuses)
+        faculty_rows.extend(faculties)
+
+    insert_batched(conn, School.__table__, school_rows, batch_size)
+    insert_batched(conn, Campus.__table__, campus_rows, batch_size)
+    insert_batched(conn, Faculty.__table__, faculty_rows, batch_size)
+    insert_batched(conn, Program.__table__, program_rows(faculty_rows), batch_size)
+    return len(school_rows), len(campus_rows), len(faculty_rows)
+
+
+def keyed(row: dict, key: str) -> dict:
+    """Parameters for an executemany UPDATE: the primary key moves to `key`, the rest is SET"""
+    params = dict(row)
+    params[key] = params.pop("id")
+    return params
+
+
+def update_documents(conn, documents: list, batch_size: int):
+    """Rewrite existing schools, touching only the campuses and faculties that changed.
+
+    Unchanged children keep their ids (campuses are matched by name/address).
+    Returns (schools, campuses, faculties) rows written.
+    """
+    campus_table, faculty_table, school_table = Campus.__table__, Faculty.__table__, School.__table__
+    school_rows, campus_updates, campus_inserts, campus_deletes = [], [], [], []
+    faculty_updates, faculty_inserts, faculty_deletes = [], [], []
+
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start:start + batch_size]
+        ids = [doc["id"] for doc in batch]
+        campuses, faculties = {}, {}
+        for row in conn.execute(select(campus_table).where(campus_table.c.school_id.in_(ids))
+                                .order_by(campus_table.c.id)).mappings():
+            campuses.setdefault(row["school_id"], []).append(row)
+        for row in conn.execute(select(faculty_table).where(faculty_table.c.school_id.in_(ids))).mappings():
+            faculties.setdefault(row["school_id"], []).append(row)
+
+        for doc in batch:
+            school_row, campus_rows, faculty_rows = document_rows(doc)
+            school_rows.append(keyed(school_row, "school_key"))
+
+            updates, inserts, deleted = diff_campuses(campuses.get(doc["id"], []), campus_rows)
+            campus_updates.extend(keyed(campus, "campus_key") for campus in updates)
+            campus_inserts.extend(inserts)
+            campus_deletes.extend(deleted)
+
+            updates, inserts, deleted = diff_faculties(faculties.get(doc["id"], []), faculty_rows)
+            faculty_updates.extend(keyed(faculty, "faculty_key") for faculty in updates)
+            faculty_inserts.extend(inserts)
+            faculty_deletes.extend(deleted)
+
+    # Deletes first: a faculty id may move from one school to another. Updated
+    # faculties get their programs index rows rewritten.
+    program_table = Program.__table__
+    rewritten = faculty_deletes + [faculty["faculty_key"] for faculty in faculty_updates]
+    for start in range(0, len(rewritten), batch_size):
+        conn.execute(delete(program_table).where(program_table.c.faculty_id.in_(rewritten[start:start + batch_size])))
+    for start in range(0, len(campus_deletes), batch_size):
+        conn.execute(delete(campus_table).where(campus_table.c.id.in_(campus_deletes[start:start + batch_size])))
+    for start in range(0, len(faculty_deletes), batch_size):
+        conn.execute(delete(faculty_table).where(faculty_table.c.id.in_(faculty_deletes[start:start + batch_size])))
+
+    # UPDATE ... SET <every column in the row> WHERE id = :key. Every school row
+    # is rewritten, so its revision changes along with its children.
+    for table, key, rows in (
+        (school_table, "school_key", school_rows),
+        (campus_table, "campus_key", campus_updates),
+        (faculty_table, "faculty_key", faculty_updates),
+    ):
+        statement = update(table).where(table.c.id == bindparam(key))
+        for start in range(0, len(rows), batch_size):
+            conn.execute(statement, rows[start:start + batch_size])
+
+    insert_batched(conn, campus_table, campus_inserts, batch_size)
+    insert_batched(conn, faculty_table, faculty_inserts, batch_size)
+    updated = [dict(faculty, id=faculty["faculty_key"]) for faculty in faculty_updates]
+    insert_batched(conn, program_table, program_rows(updated + faculty_inserts), batch_size)
+    return (
+        len(school_rows),
+        len(campus_updates) + len(campus_inserts) + len(campus_deletes),
+        len(faculty_updates) + len(faculty_inserts) + len(faculty_deletes),
+    )
+
+
+# ============= UPSERTS =============
+
+def upsert_conflicts(documents: list, code_holders: dict, faculty_owners: dict) -> dict:
+    """Documents of one batch that can't be written, as {position: reason}.
+
+    `code_holders` maps stored school codes to their school id and
+    `faculty_owners` stored faculty ids to theirs. A stored code or faculty
+    id is free when its school is rewritten by the batch, so rejecting one
+    document can make another one conflict: repeat until nothing changes.
+    """
+    errors = {}
+    seen_ids, seen_codes, seen_faculties = set(), set(), set()
+    for position, doc in enumerate(documents):
+        faculty_ids = [faculty["id"] for faculty in doc["faculties"]]
+        clashes = seen_faculties.intersection(faculty_ids)
+        if doc["id"] in seen_ids:
+            errors[position] = f"School '{doc['id']}' appears more than once in the batch"
+        elif doc["code"] in seen_codes:
+            errors[position] = f"School code '{doc['code']}' appears more than once in the batch"
+        elif clashes or len(set(faculty_ids)) != len(faculty_ids):
+            errors[position] = f"Duplicate faculty id(s) in the batch: {', '.join(sorted(clashes)) or 'within school'}"
+        seen_ids.add(doc["id"])
+        seen_codes.add(doc["code"])
+        seen_faculties.update(faculty_ids)
+
+    while True:
+        rewritten = {doc["id"] for position, doc in enumerate(documents) if position not in errors}
+        found = {}
+        for position, doc in enumerate(documents):
+            if position in errors:
+                continue
+            holder = code_holders.get(doc["code"])
+            if holder not in (None, doc["id"]) and holder not in rewritten:
+                found[position] = f"School code '{doc['code']}' is used by school '{holder}'"
+                continue
+            taken = sorted(
+                faculty["id"] for faculty in doc["faculties"]
+                if faculty_owners.get(faculty["id"]) not in (None, doc["id"])
+                and faculty_owners[faculty["id"]] not in rewritten
+            )
+            if taken:
+                found[position] = f"Faculty id(s) belong to another school: {', '.join(taken)}"
+        if not found:
+            return errors
+        errors.update(found)
+
+
+def upsert_documents(db: Session, documents: list, batch_size: int = DEFAULT_BATCH_SIZE) -> list:
+    """Create or update normalized documents in the session's transaction.
+
+    Existing schools (and holders of the incoming codes) are resolved with
+    one query; the writes are the importer's Core bulk statements. Returns
+    one (status, detail) per document: created, updated, unchanged or failed.
+    """
+    ids = [doc["id"] for doc in documents]
+    stored = {
+        school.id: school
+        for school in db.scalars(
+            select(School)
+            .where(or_(School.id.in_(ids), School.code.in_([doc["code"] for doc in documents])))
+            .options(selectinload(School.campuses), selectinload(School.faculties))
+        )
+    }
+    faculty_ids = [faculty["id"] for doc in documents for faculty in doc["faculties"]]
+    faculty_owners = dict(db.execute(select(Faculty.id, Faculty.school_id).where(Faculty.id.in_(faculty_ids))).all())
+    errors = upsert_conflicts(documents, {school.code: school.id for school in stored.values()}, faculty_owners)
+
+    results, created, updated = [], [], []
+    for position, doc in enumerate(documents):
+        if position in errors:
+            results.append(("failed", errors[position]))
+        elif doc["id"] not in stored:
+            created.append(doc)
+            results.append(("created", None))
+        elif fingerprint(school_to_document(stored[doc["id"]])) == fingerprint(doc):
+            results.append(("unchanged", None))
+        else:
+            updated.append(doc)
+            results.append(("updated", None))
+
+    # Updates first: their deletes free the faculty ids that new schools take over
+    conn = db.connection()
+    update_documents(conn, updated, batch_size)
+    insert_documents(conn, created, batch_size)
+    return results
@@ -0,0 +1,133 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+# Max number of cached responses and their lifetime in seconds. The TTL bounds
+# staleness in other worker processes, which don't see this worker's invalidations.
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+# Serialized schools kept for list/detail/batch responses
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", "4096"))
+# Catalog aggregates and facet counts, one entry per data version and filter set
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "256"))
+# Gzip/brotli bodies of hot responses
+COMPRESSED_CACHE_SIZE = int(os.getenv("COMPRESSED_CACHE_SIZE", "1024"))
+
+
+class ResponseCache:
+    """Thread-safe LRU + TTL cache of serialized response payloads, invalidated by tag"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value, tags)
+        self._tags = {}                 # tag -> set of keys
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so a build that raced a write is not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = (), generation: Optional[int] = None):
+        if self.maxsize <= 0:
+            return
+        tags = frozenset(tags)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *tags: str):
+        """Drop every entry carrying any of `tags`"""
+        with self._lock:
+            self.generation += 1
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+response_cache = ResponseCache()
+
+# JSON bytes of one school, keyed by (school_id, revision, include). Every write
+# (API or importer) stores a new revision, so entries never go stale and need
+# neither a TTL nor invalidation; old revisions simply fall out of the LRU.
+fragment_cache = ResponseCache(maxsize=FRAGMENT_CACHE_SIZE, ttl=math.inf)
+
+# /stats and `facets=` counts keyed by the change log version (see app/changes.py),
+# which every write bumps, so entries never go stale.
+stats_cache = ResponseCache(maxsize=STATS_CACHE_SIZE, ttl=math.inf)
+
+# Compressed bodies keyed by (strong ETag, encoding); the ETag hashes the
+# uncompressed bytes, so like fragments these never go stale.
+compressed_cache = ResponseCache(maxsize=COMPRESSED_CACHE_SIZE, ttl=math.inf)
+
+
+def school_tag(school_id: str) -> str:
+    """Tag carried by every cached response that depends on a school or its children"""
+    return f"school:{school_id}"
+
+
+async def cached(key: Hashable, tags: Iterable[str], build: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached value for `key`, or await `build()` and store it on a miss"""
+    value = response_cache.get(key)
+    if value is None:
+        generation = response_cache.generation
+        value = await build()
+        response_cache.set(key, value, tags, generation=generation)
+    return value
@@ -0,0 +1,20 @@
+from typing import Iterable
+
+from sqlalchemy import func, insert, select
+
+from app.models import Change
+
+
+def record_changes(db, school_ids: Iterable[str]):
+    """Append one change per written or deleted school.
+
+    `db` is the Session or Connection of the writing transaction, so a change
+    becomes visible together with the write it describes.
+    """
+    rows = [{"school_id": school_id} for school_id in school_ids]
+    if rows:
+        db.execute(insert(Change.__table__), rows)
+
+
+def latest_version(db) -> int:
+    return db.execute(select(func.max(Change.version))).scalar() or 0
@@ -0,0 +1,176 @@
+import gzip
+import os
+from typing import Iterable, Iterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import compressed_cache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+# Bodies smaller than this are sent as is; the headers would eat most of the gain
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Compress larger bodies in a worker thread instead of blocking the event loop
+THREADPOOL_MIN_SIZE = 256 * 1024
+
+# Preferred first when the client weighs them equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content coding from an Accept-Encoding header, or None"""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            weights[coding.strip()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in ENCODINGS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical bodies
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def brotli_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Brotli-compress a byte stream incrementally"""
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def _header(headers: list, name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _replace_header(headers: list, name: bytes, value: bytes) -> list:
+    return [(key, val) for key, val in headers if key.lower() != name] + [(name, value)]
+
+
+def _add_vary(headers: list) -> list:
+    vary = _header(headers, b"vary")
+    if vary is None:
+        return headers + [(b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return headers
+    return _replace_header(headers, b"vary", vary + b", Accept-Encoding")
+
+
+def _weak(etag: bytes) -> bytes:
+    return etag if etag.startswith(b"W/") else b"W/" + etag
+
+
+class CompressionMiddleware:
+    """Pure ASGI gzip/brotli compression of complete JSON and text bodies.
+
+    Streaming responses (more_body) and responses that already carry a
+    Content-Encoding, like the export, pass through untouched. Compressed
+    bodies are cached by strong ETag, which is a hash of the uncompressed
+    bytes, so a hot response is compressed once per data version. The ETag
+    of a compressed response is weakened: same content, different bytes.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = None
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                encoding = negotiate_encoding(value.decode("latin-1"))
+                break
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                etag = _header(headers, b"etag")
+                if message["status"] == 304:
+                    # No body and no Content-Type; send the validator a 200 would carry
+                    if encoding is not None and etag is not None:
+                        headers = _replace_header(_add_vary(headers), b"etag", _weak(etag))
+                    await send(dict(message, headers=headers))
+                    return
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if _header(headers, b"content-encoding") is not None or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    await send(message)
+                    return
+                headers = _add_vary(headers)
+                if message["status"] != 200 or encoding is None:
+                    await send(dict(message, headers=headers))
+                    return
+                # Hold the start until the body shows whether it is worth compressing
+                start = dict(message, headers=headers)
+                return
+
+            if start is None or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            held, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                await send(held)
+                await send(message)
+                return
+
+            headers = held["headers"]
+            etag = _header(headers, b"etag")
+            compressed = await self.compressed_body(body, encoding, etag)
+            headers = _replace_header(headers, b"content-length", str(len(compressed)).encode("latin-1"))
+            headers = _replace_header(headers, b"content-encoding", encoding.encode("latin-1"))
+            if etag is not None:
+                headers = _replace_header(headers, b"etag", _weak(etag))
+            await send(dict(held, headers=headers))
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def compressed_body(self, body: bytes, encoding: str, etag: Optional[bytes]) -> bytes:
+        # Only strong ETags identify the exact bytes
+        key = (etag, encoding) if etag is not None and not etag.startswith(b"W/") else None
+        if key is not None:
+            compressed = compressed_cache.get(key)
+            if compressed is not None:
+                return compressed
+
+        if len(body) >= THREADPOOL_MIN_SIZE:
+            compressed = await run_in_threadpool(compress, body, encoding)
+        else:
+            compressed = compress(body, encoding)
+
+        if key is not None:
+            compressed_cache.set(key, compressed)
+        return compressed
@@ -0,0 +1,72 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Browser/CDN freshness for GET responses; writes don't purge the CDN, so keep it short
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "60"))
+HTTP_CACHE_CONTROL = f"public, max-age={HTTP_CACHE_MAX_AGE}"
+
+
+class Payload(NamedTuple):
+    """A serialized JSON body together with its validators"""
+    body: bytes
+    etag: str
+    last_modified: Optional[str] = None
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def http_date(updated_at: Optional[str]) -> Optional[str]:
+    """Convert a `metadata.updated_at` value (ISO date or datetime) to an HTTP-date"""
+    if not updated_at:
+        return None
+    try:
+        value = datetime.fromisoformat(updated_at)
+    except ValueError:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def latest_http_date(updated_ats: Iterable[Optional[str]]) -> Optional[str]:
+    """HTTP-date of the most recent `updated_at` among several rows"""
+    latest = max((value for value in updated_ats if value), default=None)
+    return http_date(latest)
+
+
+def make_payload(body: bytes, updated_at: Optional[str] = None) -> Payload:
+    return Payload(body, make_etag(body), http_date(updated_at))
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match with the weak comparison RFC 9110 prescribes for it"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def conditional_response(request: Request, payload: Payload, cache_control: str = HTTP_CACHE_CONTROL) -> Response:
+    """Answer with 304 Not Modified if the client's copy is current, else send the body.
+
+    Last-Modified is informational only: `updated_at` has day granularity, so
+    If-Modified-Since could hide same-day edits and is deliberately not honored.
+    """
+    headers = {"ETag": payload.etag, "Cache-Control": cache_control}
+    if payload.last_modified:
+        headers["Last-Modified"] = payload.last_modified
+
+    if etag_matches(request, payload.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload.body, media_type="application/json", headers=headers)
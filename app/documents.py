@@ -0,0 +1,193 @@
+import json
+
+from app.search import build_search_text
+
+CONTACT_FIELDS = ("website", "email", "phone")
+CAMPUS_FIELDS = ("name", "address", "is_main", "latitude", "longitude")
+# Optional campus fields, left out of documents when unknown, and their bounds
+COORDINATE_FIELDS = ("latitude", "longitude")
+COORDINATE_LIMITS = {"latitude": 90.0, "longitude": 180.0}
+FACULTY_FIELDS = ("name", "code", "website", "programs")
+
+
+# ============= DOCUMENT -> ROWS =============
+
+def coordinate(campus: dict, field: str) -> float:
+    """A campus latitude/longitude as float; raises ValueError when out of range"""
+    value = float(campus[field])
+    if abs(value) > COORDINATE_LIMITS[field]:
+        raise ValueError(f"{field} {value} out of range")
+    return value
+
+
+def normalize_document(data: dict) -> dict:
+    """Fill in defaults so equal schools produce equal documents; raises KeyError on missing fields"""
+    contact = data.get("contact") or {}
+    return {
+        "id": data["id"],
+        "code": data["code"],
+        "name": data["name"],
+        "logo_url": data.get("logo_url"),
+        "description": data["description"],
+        "type": data["type"],
+        "country": data["country"],
+        "contact": {field: contact[field] for field in CONTACT_FIELDS if contact.get(field) is not None},
+        "campuses": [
+            {
+                "name": campus["name"],
+                "address": campus["address"],
+                "is_main": bool(campus.get("is_main", False)),
+                **{field: coordinate(campus, field) for field in COORDINATE_FIELDS if campus.get(field) is not None},
+            }
+            for campus in data.get("campuses", [])
+        ],
+        "faculties": [
+            {
+                "id": faculty["id"],
+                "name": faculty["name"],
+                "code": faculty.get("code"),
+                "website": faculty.get("website"),
+                "programs": list(faculty.get("programs") or []),
+            }
+            for faculty in data.get("faculties", [])
+        ],
+        "metadata": {
+            "verified": bool(data["metadata"]["verified"]),
+            "created_at": data["metadata"]["created_at"],
+            "updated_at": data["metadata"]["updated_at"],
+        },
+    }
+
+
+def document_rows(doc: dict):
+    """Split a normalized document into (school_row, campus_rows, faculty_rows) for Core inserts"""
+    school_row = {
+        "id": doc["id"],
+        "code": doc["code"],
+        "name": doc["name"],
+        "logo_url": doc["logo_url"],
+        "description": doc["description"],
+        "type": doc["type"],
+        "country": doc["country"],
+        "contact": doc["contact"],
+        "verified": doc["metadata"]["verified"],
+        "created_at": doc["metadata"]["created_at"],
+        "updated_at": doc["metadata"]["updated_at"],
+        # Core inserts bypass the ORM events that maintain the shadow column
+        "search_text": build_search_text(doc["name"], doc["code"]),
+    }
+    campus_rows = [
+        dict(campus, school_id=doc["id"], **{field: campus.get(field) for field in COORDINATE_FIELDS})
+        for campus in doc["campuses"]
+    ]
+    faculty_rows = [
+        dict(faculty, school_id=doc["id"], search_text=build_search_text(faculty["name"], faculty["code"]))
+        for faculty in doc["faculties"]
+    ]
+    return school_row, campus_rows, faculty_rows
+
+
+def program_rows(faculty_rows: list) -> list:
+    """Rows of the programs index (one per entry of each faculty's `programs`) for Core inserts"""
+    return [
+        {
+            "faculty_id": faculty["id"],
+            "school_id": faculty["school_id"],
+            "name": name,
+            "search_text": build_search_text(name),
+        }
+        for faculty in faculty_rows
+        for name in faculty["programs"] or ()
+    ]
+
+
+# ============= CHILD DIFFS =============
+
+def diff_campuses(existing: list, incoming: list):
+    """Pair incoming campuses with existing rows by name, then by address, so they keep their id.
+
+    `existing` rows carry an "id". Returns (updates, inserts, deleted_ids);
+    updates are incoming campuses with the id of the row they change.
+    """
+    unmatched = list(existing)
+    updates, remaining = [], list(incoming)
+    for key in ("name", "address"):
+        left = []
+        for campus in remaining:
+            row = next((row for row in unmatched if row[key] == campus[key]), None)
+            if row is None:
+                left.append(campus)
+                continue
+            unmatched.remove(row)
+            if any(row[field] != campus[field] for field in CAMPUS_FIELDS):
+                updates.append(dict(campus, id=row["id"]))
+        remaining = left
+    return updates, remaining, [row["id"] for row in unmatched]
+
+
+def diff_faculties(existing: list, incoming: list):
+    """Match faculties by id; returns (updates, inserts, deleted_ids)"""
+    current = {row["id"]: row for row in existing}
+    updates = [
+        faculty for faculty in incoming
+        if faculty["id"] in current
+        and any(current[faculty["id"]][field] != faculty[field] for field in FACULTY_FIELDS)
+    ]
+    inserts = [faculty for faculty in incoming if faculty["id"] not in current]
+    incoming_ids = {faculty["id"] for faculty in incoming}
+    return updates, inserts, [faculty_id for faculty_id in current if faculty_id not in incoming_ids]
+
+
+# ============= ORM -> DOCUMENT =============
+
+def school_to_document(school) -> dict:
+    """Rebuild the data/*.json document of a School loaded with its campuses and faculties"""
+    contact = school.contact or {}
+    return {
+        "id": school.id,
+        "code": school.code,
+        "name": school.name,
+        "logo_url": school.logo_url,
+        "description": school.description,
+        "type": school.type,
+        "country": school.country,
+        "contact": {field: contact[field] for field in CONTACT_FIELDS if contact.get(field) is not None},
+        "campuses": [
+            {
+                "name": campus.name,
+                "address": campus.address,
+                "is_main": bool(campus.is_main),
+                **{field: getattr(campus, field) for field in COORDINATE_FIELDS if getattr(campus, field) is not None},
+            }
+            for campus in sorted(school.campuses, key=lambda campus: campus.id)
+        ],
+        "faculties": [
+            {
+                "id": faculty.id,
+                "name": faculty.name,
+                "code": faculty.code,
+                "website": faculty.website,
+                "programs": list(faculty.programs or []),
+            }
+            for faculty in school.faculties
+        ],
+        "metadata": {
+            "verified": bool(school.verified),
+            "created_at": school.created_at,
+            "updated_at": school.updated_at,
+        },
+    }
+
+
+def fingerprint(doc: dict) -> str:
+    """Order-insensitive (for children) canonical form used to detect changed schools.
+
+    Updates diff children in place and append new ones, so their stored order
+    need not follow the file.
+    """
+    canonical = dict(
+        doc,
+        campuses=sorted(doc["campuses"], key=lambda campus: (campus["name"], campus["address"], campus["is_main"])),
+        faculties=sorted(doc["faculties"], key=lambda faculty: faculty["id"]),
+    )
+    return json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,54 @@
+import json
+import zlib
+from typing import Iterable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.compression import GZIP_LEVEL
+from app.database import SessionLocal
+from app.documents import school_to_document
+from app.models import School
+
+# Schools fetched (and children batch-loaded) per round trip while streaming
+EXPORT_BATCH_SIZE = 500
+
+
+def iter_documents(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Yield every school as a data/*.json document, holding one batch in memory at a time.
+
+    Uses its own session: a streaming body outlives the request's dependencies.
+    """
+    statement = (
+        select(School)
+        .options(selectinload(School.campuses), selectinload(School.faculties))
+        .order_by(School.id)
+        .execution_options(yield_per=batch_size)
+    )
+    with SessionLocal() as db:
+        for partition in db.scalars(statement).partitions():
+            # The identity map is weak-referencing, so finished batches are freed
+            for school in partition:
+                yield school_to_document(school)
+
+
+def ndjson_chunks(documents: Iterable[dict], lines_per_chunk: int = 100) -> Iterator[bytes]:
+    """Encode documents as newline-delimited JSON, a few lines per chunk"""
+    lines = []
+    for document in documents:
+        lines.append(json.dumps(document, ensure_ascii=False, separators=(",", ":")))
+        if len(lines) >= lines_per_chunk:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally, at the GZIP_LEVEL the compression middleware uses"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
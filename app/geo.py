@@ -0,0 +1,143 @@
+import math
+from bisect import bisect_left, bisect_right
+from typing import Callable, Iterable, Optional, Tuple
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.engine import Engine
+
+EARTH_RADIUS_KM = 6371.0088
+# Nothing on Earth is farther away than half a great circle
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+# First radius tried by a k-nearest search without radius_km; grows 4x per round
+INITIAL_RADIUS_KM = 10.0
+
+# (min_lat, max_lat, min_lon, max_lon)
+Box = Tuple[float, float, float, float]
+
+RTREE = table(
+    "campuses_rtree",
+    column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"),
+)
+
+
+# ============= GEOMETRY =============
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two WGS84 points"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Box:
+    """Smallest lat/lon box containing every point within radius_km.
+
+    Falls back to the full longitude range near the poles and across the
+    antimeridian instead of splitting the box in two.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    dlat = math.degrees(angle)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90 or angle >= math.pi / 2:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    ratio = math.sin(angle) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return min_lat, max_lat, -180.0, 180.0
+    dlon = math.degrees(math.asin(ratio))
+    if lon - dlon < -180 or lon + dlon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def nearest(find: Callable[[Box], Iterable], lat: float, lon: float, limit: int,
+            radius_km: Optional[float] = None) -> list:
+    """The `limit` campuses closest to (lat, lon), within radius_km if given, as (distance, campus).
+
+    `find(box)` returns the located campuses inside a bounding box (an index
+    lookup). The search radius starts small and grows until it holds `limit`
+    campuses, so a k-nearest query never reads the whole table.
+    """
+    cap = min(radius_km, MAX_DISTANCE_KM) if radius_km is not None else MAX_DISTANCE_KM
+    radius = min(INITIAL_RADIUS_KM, cap)
+    while True:
+        matches = []
+        for campus in find(bounding_box(lat, lon, radius)):
+            distance = haversine_km(lat, lon, campus.latitude, campus.longitude)
+            if distance <= radius:
+                matches.append((distance, campus))
+        # Every campus within `radius` is in the box, so these are the true nearest
+        if len(matches) >= limit or radius >= cap:
+            matches.sort(key=lambda match: (match[0], match[1].id))
+            return matches[:limit]
+        radius = min(radius * 4, cap)
+
+
+# ============= INDEX LOOKUPS =============
+
+def apply_box(query, model, box: Box, dialect: str):
+    """Restrict a Campus query to rows inside `box`, through the R*Tree on SQLite"""
+    min_lat, max_lat, min_lon, max_lon = box
+    if dialect == "sqlite":
+        # A point is stored as a degenerate box, so containment is plain overlap
+        return query.filter(model.id.in_(
+            select(RTREE.c.id).where(
+                RTREE.c.max_lat >= min_lat, RTREE.c.min_lat <= max_lat,
+                RTREE.c.max_lon >= min_lon, RTREE.c.min_lon <= max_lon,
+            )
+        ))
+    return query.filter(
+        model.latitude.between(min_lat, max_lat),
+        model.longitude.between(min_lon, max_lon),
+    )
+
+
+class LatitudeIndex:
+    """Located campuses sorted by latitude: a box lookup bisects the latitude band, then filters"""
+
+    __slots__ = ("campuses", "latitudes")
+
+    def __init__(self, campuses: Iterable):
+        located = [campus for campus in campuses if campus.latitude is not None and campus.longitude is not None]
+        self.campuses = tuple(sorted(located, key=lambda campus: (campus.latitude, campus.id)))
+        self.latitudes = [campus.latitude for campus in self.campuses]
+
+    def find(self, box: Box) -> list:
+        min_lat, max_lat, min_lon, max_lon = box
+        start, end = bisect_left(self.latitudes, min_lat), bisect_right(self.latitudes, max_lat)
+        return [campus for campus in self.campuses[start:end] if min_lon <= campus.longitude <= max_lon]
+
+
+# ============= INDEX MAINTENANCE =============
+
+_LOCATED = "new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+_RTREE_ROW = "new.id, new.latitude, new.latitude, new.longitude, new.longitude"
+
+_CREATE_RTREE_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS campuses_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)",
+    f"CREATE TRIGGER IF NOT EXISTS campuses_rtree_ai AFTER INSERT ON campuses WHEN {_LOCATED} BEGIN "
+    f"INSERT INTO campuses_rtree VALUES ({_RTREE_ROW}); END",
+    "CREATE TRIGGER IF NOT EXISTS campuses_rtree_ad AFTER DELETE ON campuses BEGIN "
+    "DELETE FROM campuses_rtree WHERE id = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS campuses_rtree_au AFTER UPDATE ON campuses BEGIN "
+    "DELETE FROM campuses_rtree WHERE id = old.id; "
+    f"INSERT INTO campuses_rtree SELECT {_RTREE_ROW} WHERE {_LOCATED}; END",
+]
+
+
+def ensure_spatial_index(engine: Engine):
+    """Create the SQLite R*Tree over campus coordinates and fill it for existing rows"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'campuses_rtree'")
+        ).first()
+        for statement in _CREATE_RTREE_SQL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text(
+                "INSERT INTO campuses_rtree SELECT id, latitude, latitude, longitude, longitude "
+                "FROM campuses WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            ))
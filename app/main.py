@@ -1,20 +1,45 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, load_only, selectinload, noload
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import List, Optional
-from slowapi import Limiter, _rate_limit_exceeded_handler
+from pydantic import ConfigDict, TypeAdapter, create_model
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from slowapi.util import get_remote_address
 
 import app.models as models
 import app.schemas as schemas
-from app.database import engine, get_db
+from app.pagination import paginate, paginate_records, set_next_cursor
+from app.search import apply_search, search_rank
+from app.bulk import upsert_conflicts, upsert_documents
+from app.cache import cached, compressed_cache, fragment_cache, response_cache, school_tag, stats_cache
+from app.changes import latest_version, record_changes
+from app.compression import CompressionMiddleware, brotli_chunks, negotiate_encoding
+from app.conditional import conditional_response, latest_http_date, make_payload
+from app.database import Database, async_engine, engine, get_database
+from app.documents import CAMPUS_FIELDS, FACULTY_FIELDS, diff_campuses, diff_faculties, normalize_document
+from app.export import gzip_chunks, iter_documents, ndjson_chunks
+from app.geo import apply_box, nearest
+from app.metrics import (
+    TimingMiddleware, instrument_engine, measure_serialization, rate_limit_rejections, registry, route_label
+)
+from app.rate_limiter import RateLimits, limiter
+from app.serialization import DefaultJSONResponse, dump_json, json_array
+from app.snapshot import SNAPSHOT_MODE, snapshot_store
+from app.startup import start, stop
+from app.stats import FACETS, compute_stats, record_facets, school_facets
+from app.suggest import MAX_SUGGESTIONS, suggest_store
 
-# Create tables
-models.Base.metadata.create_all(bind=engine)
 
-# ============= RATE LIMITER SETUP =============
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema upgrade and warm-up run here rather than at import, so importing app.main does no I/O
+    await start(app)
+    yield
+    await stop()
 
 # FastAPI app
 app = FastAPI(
@@ -29,287 +54,1122 @@ app = FastAPI(
     license_info={
         "name": "MIT",
     },
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan,
 )
 
 # Attach rate limiter to app
 app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+
+def rate_limit_exceeded(request: Request, exc: RateLimitExceeded):
+    rate_limit_rejections.inc((route_label(request.scope),))
+    return _rate_limit_exceeded_handler(request, exc)
+
+
+app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded)
+
+# gzip/brotli per Accept-Encoding; added first so the timing below includes it
+app.add_middleware(CompressionMiddleware)
+# Per-route latency, query count/time and serialization time; see /metrics
+app.add_middleware(TimingMiddleware)
+instrument_engine(engine)
+if async_engine is not None:
+    instrument_engine(async_engine.sync_engine)
+
+
+ROOT_INFO = {
+    "message": "Vietnam Schools API",
+    "version": "1.0.0",
+    "docs": "/docs",
+    "endpoints": {
+        "schools": "/api/v1/schools",
+        "faculties": "/api/v1/faculties",
+        "programs": "/api/v1/programs",
+        "suggest": "/api/v1/suggest",
+        "nearby_campuses": "/api/v1/campuses/nearby",
+        "changes": "/api/v1/changes",
+        "stats": "/api/v1/stats"
+    },
+    "github": "https://github.com/ZenithHawking/schools-api"
+}
+ROOT_PAYLOAD = make_payload(dump_json(ROOT_INFO))
 
 
 @app.get("/", tags=["Root"])
-def root():
+@limiter.limit(RateLimits.HEALTH)
+async def root(request: Request):
     """API Root - Welcome message"""
-    return {
-        "message": "Vietnam Schools API",
-        "version": "1.0.0",
-        "docs": "/docs",
-        "endpoints": {
-            "schools": "/api/v1/schools",
-            "faculties": "/api/v1/faculties"
-        },
-        "github": "https://github.com/ZenithHawking/schools-api"
-    }
+    return conditional_response(request, ROOT_PAYLOAD)
+
+
+# ============= EAGER LOADING =============
+
+# Child collections of a school that can be embedded in responses
+SCHOOL_CHILDREN = {
+    "campuses": models.School.campuses,
+    "faculties": models.School.faculties,
+}
+
+
+def parse_include(include: Optional[str]) -> set:
+    """Parse the `include` query parameter into a set of child collection names"""
+    if include is None:
+        return set(SCHOOL_CHILDREN)
+
+    names = {name.strip().lower() for name in include.split(",") if name.strip()}
+    unknown = names - set(SCHOOL_CHILDREN)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include value(s): {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(SCHOOL_CHILDREN)}"
+        )
+    return names
+
+
+def parse_facets(facets: str) -> tuple:
+    """Parse the `facets` query parameter into facet names, in FACETS order"""
+    names = {name.strip().lower() for name in facets.split(",") if name.strip()}
+    unknown = names - set(FACETS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown facet(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(FACETS)}"
+        )
+    return tuple(name for name in FACETS if name in names)
+
+
+def school_load_options(include: set) -> list:
+    """Batch-load requested children with one SELECT ... IN per collection, skip the rest"""
+    return [
+        selectinload(attr) if name in include else noload(attr)
+        for name, attr in SCHOOL_CHILDREN.items()
+    ]
+
+
+# ============= BATCH LOOKUPS =============
+
+def parse_ids(ids: str) -> list:
+    """Parse a comma-separated `ids` query parameter, keeping request order"""
+    wanted = [value.strip() for value in ids.split(",") if value.strip()]
+    if not wanted:
+        raise HTTPException(status_code=400, detail="'ids' must contain at least one id")
+    if len(wanted) > schemas.MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {schemas.MAX_BATCH_IDS} ids per request")
+    return wanted
+
+
+def fetch_by_ids(query, model, ids: list) -> dict:
+    """Resolve many primary keys with a single IN (...) query"""
+    return {row.id: row for row in query.filter(model.id.in_(set(ids))).all()}
+
+
+def pick_by_ids(records, ids: list) -> dict:
+    """In-memory `fetch_by_ids` over already filtered snapshot records"""
+    wanted = set(ids)
+    return {record.id: record for record in records if record.id in wanted}
+
+
+def set_missing_ids(response, ids: list, found: dict):
+    missing = [value for value in ids if value not in found]
+    if missing:
+        response.headers["X-Missing-Ids"] = ",".join(missing)
+
+
+# ============= RESPONSE SERIALIZERS =============
+
+school_adapter = TypeAdapter(schemas.School)
+faculty_adapter = TypeAdapter(schemas.Faculty)
+faculty_list_adapter = TypeAdapter(List[schemas.FacultyList])
+faculty_batch_adapter = TypeAdapter(schemas.FacultyBatchResponse)
+faculties_adapter = TypeAdapter(List[schemas.Faculty])
+campuses_adapter = TypeAdapter(List[schemas.Campus])
+programs_adapter = TypeAdapter(List[schemas.Program])
+nearby_adapter = TypeAdapter(List[schemas.NearbyCampus])
+
+
+def serialize(adapter: TypeAdapter, obj) -> bytes:
+    """Validate ORM object(s) against a response schema and dump them to JSON bytes"""
+    with measure_serialization():
+        return adapter.dump_json(adapter.validate_python(obj, from_attributes=True))
+
+
+# ============= SCHOOL FRAGMENTS =============
+
+# Columns needed to look up cached fragments; the full rows are only loaded on a miss
+SCHOOL_KEY_COLUMNS = (models.School.id, models.School.revision, models.School.updated_at)
+
+
+def fragment_key(school, children: set) -> tuple:
+    return (school.id, school.revision, tuple(sorted(children)))
+
+
+def store_fragment(school, children: set) -> bytes:
+    """Serialize a fully loaded school once and keep the bytes for later responses"""
+    body = serialize(school_adapter, school)
+    fragment_cache.set(fragment_key(school, children), body)
+    return body
+
+
+def school_fragments(db: Session, rows: list, children: set) -> dict:
+    """Map each (id, revision) row's id to its JSON bytes, serializing only uncached schools"""
+    fragments = {}
+    missing = []
+    for row in rows:
+        body = fragment_cache.get(fragment_key(row, children))
+        if body is None:
+            missing.append(row.id)
+        else:
+            fragments[row.id] = body
+
+    if missing:
+        query = db.query(models.School).options(*school_load_options(children))
+        for school in query.filter(models.School.id.in_(missing)):
+            fragments[school.id] = store_fragment(school, children)
+
+    # A school deleted since `rows` were read is simply absent
+    return fragments
+
+
+def snapshot_fragments(schools, children: set) -> dict:
+    """`school_fragments` for snapshot records, which already hold every child"""
+    fragments = {}
+    for school in schools:
+        key = fragment_key(school, children)
+        body = fragment_cache.get(key)
+        if body is None:
+            view = school.replace(**{name: () for name in SCHOOL_CHILDREN if name not in children})
+            body = serialize(school_adapter, view)
+            fragment_cache.set(key, body)
+        fragments[school.id] = body
+    return fragments
+
+
+def school_list_payload(schools: list, fragments: dict):
+    payload = make_payload(json_array(fragments[row.id] for row in schools if row.id in fragments))
+    return payload._replace(last_modified=latest_http_date(school.updated_at for school in schools))
+
+
+def school_batch_body(ids: list, fragments: dict) -> bytes:
+    """Same shape as SchoolBatchResponse, spliced together from cached fragments"""
+    results = [
+        b'{"id":' + dump_json(value) + b',"found":true,"school":' + fragments[value] + b"}"
+        if value in fragments else
+        b'{"id":' + dump_json(value) + b',"found":false,"school":null}'
+        for value in ids
+    ]
+    return b'{"results":' + json_array(results) + b"}"
+
+
+# ============= SPARSE FIELDSETS =============
+
+# `view` shortcuts; None means the endpoint's default representation
+SCHOOL_VIEWS = {"summary": tuple(schemas.SchoolList.model_fields), "full": None}
+FACULTY_VIEWS = {"summary": tuple(schemas.FacultyList.model_fields), "full": tuple(schemas.Faculty.model_fields)}
+
+
+def parse_fields(fields: Optional[str], view: Optional[str], schema, views: dict) -> Optional[tuple]:
+    """Resolve `fields`/`view` to the field names to return in schema order, or None for the default"""
+    if fields is not None and view is not None:
+        raise HTTPException(status_code=400, detail="Use either 'fields' or 'view', not both")
+    if view is not None:
+        if view not in views:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown view '{view}'. Allowed: {', '.join(views)}"
+            )
+        return views[view]
+    if fields is None:
+        return None
+
+    names = {name.strip().lower() for name in fields.split(",") if name.strip()}
+    unknown = names - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(sorted(unknown))}. "
+                   f"Allowed: {', '.join(schema.model_fields)}"
+        )
+    # The id is always returned
+    return tuple(name for name in schema.model_fields if name in names or name == "id")
+
+
+@lru_cache(maxsize=256)
+def projection_adapter(schema, names: tuple) -> TypeAdapter:
+    """List adapter for `schema` cut down to `names`; validation reads no other attribute"""
+    model = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in names},
+    )
+    return TypeAdapter(List[model])
+
+
+def projection_options(model, names: tuple, children: dict, always: tuple = ()) -> list:
+    """Load only the requested columns (plus `always`) and only the requested children"""
+    columns = [getattr(model, name) for name in names if name not in children]
+    options = [load_only(*columns, *always)]
+    options.extend(
+        selectinload(attr) if name in names else noload(attr)
+        for name, attr in children.items()
+    )
+    return options
+
+
+def projected_school_payload(schools: list, names: tuple):
+    payload = make_payload(serialize(projection_adapter(schemas.School, names), schools))
+    return payload._replace(last_modified=latest_http_date(school.updated_at for school in schools))
+
+
+# ============= SNAPSHOT SERVING =============
+
+async def read(database: Database, build, from_snapshot):
+    """Answer from the in-memory snapshot in SNAPSHOT_MODE, otherwise run `build` on the database"""
+    if SNAPSHOT_MODE:
+        if snapshot_store.needs_check():
+            await run_in_threadpool(snapshot_store.check)
+        return from_snapshot(snapshot_store.current)
+    return await database.run(build)
+
+
+async def refresh_snapshot():
+    """Swap in a snapshot containing this process's write; call before invalidating caches"""
+    if SNAPSHOT_MODE:
+        await run_in_threadpool(snapshot_store.refresh)
+
+
+# ============= SCHOOL WRITES =============
+
+def sync_children(db: Session, db_school: models.School, school: schemas.SchoolCreate):
+    """Apply the campuses/faculties of `school` as a diff against the stored children"""
+    campuses = {campus.id: campus for campus in db_school.campuses}
+    updates, inserts, deleted = diff_campuses(
+        [{"id": campus.id, **{field: getattr(campus, field) for field in CAMPUS_FIELDS}}
+         for campus in sorted(campuses.values(), key=lambda campus: campus.id)],
+        [campus.model_dump() for campus in school.campuses],
+    )
+    for values in updates:
+        for field in CAMPUS_FIELDS:
+            setattr(campuses[values["id"]], field, values[field])
+    for campus_id in deleted:
+        db.delete(campuses[campus_id])
+    for values in inserts:
+        db.add(models.Campus(school_id=db_school.id, **values))
+
+    faculties = {faculty.id: faculty for faculty in db_school.faculties}
+    updates, inserts, deleted = diff_faculties(
+        [{"id": faculty.id, **{field: getattr(faculty, field) for field in FACULTY_FIELDS}}
+         for faculty in faculties.values()],
+        [faculty.model_dump() for faculty in school.faculties],
+    )
+    for values in updates:
+        for field in FACULTY_FIELDS:
+            setattr(faculties[values["id"]], field, values[field])
+    for faculty_id in deleted:
+        db.delete(faculties[faculty_id])
+    for values in inserts:
+        db.add(models.Faculty(school_id=db_school.id, **values))
 
 
 # ============= SCHOOLS ENDPOINTS =============
 
 @app.get("/api/v1/schools", response_model=List[schemas.School], tags=["Schools"])
-@limiter.limit("100/minute")
-def list_schools(
+@limiter.limit(RateLimits.LIST)
+async def list_schools(
     request: Request,
     skip: int = Query(0, ge=0, description="Number of records to skip"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
     limit: int = Query(100, ge=1, le=500, description="Max number of records to return"),
     code: Optional[str] = Query(None, description="Filter by exact school code"),
     country: Optional[str] = Query(None, description="Filter by country code (e.g., VN)"),
     type: Optional[str] = Query(None, description="Filter by type: public or private"),
     verified: Optional[bool] = Query(None, description="Filter by verification status"),
     search: Optional[str] = Query(None, description="Search in school name or code"),
-    db: Session = Depends(get_db)
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated children to embed: campuses,faculties (default: all, empty: none)"
+    ),
+    ids: Optional[str] = Query(
+        None,
+        description=f"Comma-separated school ids (max {schemas.MAX_BATCH_IDS}), returned in request order "
+                    "without pagination; unknown ids are listed in X-Missing-Ids"
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return, e.g. id,code,name (id is always included); "
+                    "list campuses/faculties here to embed them"
+    ),
+    view: Optional[str] = Query(None, description="summary (id, code, name, type, country, verified) or full"),
+    facets: Optional[str] = Query(
+        None,
+        description="Comma-separated facets to count over all matching schools: country,type,verified "
+                    "(returned as JSON in the X-Facets header)"
+    ),
+    database: Database = Depends(get_database)
 ):
     """Get list of schools with filters (Rate limit: 100/minute)"""
-    query = db.query(models.School)
-    
-    # Apply filters
-    if code:
-        query = query.filter(models.School.code == code.upper())
-    if country:
-        query = query.filter(models.School.country == country.upper())
-    if type:
-        query = query.filter(models.School.type == type.lower())
-    if verified is not None:
-        query = query.filter(models.School.verified == verified)
-    if search:
-        query = query.filter(
-            or_(
-                models.School.name.ilike(f"%{search}%"),
-                models.School.code.ilike(f"%{search}%")
+    children = parse_include(include)
+    wanted = parse_ids(ids) if ids is not None else None
+    facet_names = parse_facets(facets) if facets else ()
+    # Facet counts depend on the filters only, not on the page
+    facet_key = (code, country, type, verified, search, tuple(wanted or ()), facet_names)
+    projection = parse_fields(fields, view, schemas.School, SCHOOL_VIEWS)
+    if projection is not None and include is not None:
+        raise HTTPException(status_code=400, detail="Use either 'include' or 'fields'/'view'")
+
+    def build(db: Session):
+        if projection is None:
+            query = db.query(*SCHOOL_KEY_COLUMNS)
+        else:
+            # updated_at feeds Last-Modified
+            query = db.query(models.School).options(
+                *projection_options(models.School, projection, SCHOOL_CHILDREN, (models.School.updated_at,))
             )
+        
+        # Apply filters
+        if code:
+            query = query.filter(models.School.code == code.upper())
+        if country:
+            query = query.filter(models.School.country == country.upper())
+        if type:
+            query = query.filter(models.School.type == type.lower())
+        if verified is not None:
+            query = query.filter(models.School.verified == verified)
+        rank = None
+        if search:
+            # Accent-insensitive full-text match, best matches first
+            query = apply_search(query, models.School, search, db.bind.dialect.name)
+            rank = search_rank(models.School, search, db.bind.dialect.name)
+        
+        counts = None
+        if facet_names:
+            key = ("facets", latest_version(db)) + facet_key
+            counts = stats_cache.get(key)
+            if counts is None:
+                matched = query.filter(models.School.id.in_(wanted)) if wanted is not None else query
+                counts = school_facets(matched, facet_names)
+                stats_cache.set(key, counts)
+
+        found = None
+        if wanted is not None:
+            found = fetch_by_ids(query, models.School, wanted)
+            schools, next_cursor = [found[value] for value in wanted if value in found], None
+        else:
+            schools, next_cursor = paginate(query, models.School, limit, skip=skip, cursor=cursor, rank=rank)
+        if projection is not None:
+            return projected_school_payload(schools, projection), next_cursor, found, counts
+        return school_list_payload(schools, school_fragments(db, schools, children)), next_cursor, found, counts
+
+    def from_snapshot(snapshot):
+        schools = snapshot.find_schools(
+            code=code.upper() if code else None,
+            country=country.upper() if country else None,
+            type=type.lower() if type else None,
+            verified=verified,
         )
-    
-    schools = query.offset(skip).limit(limit).all()
-    return schools
+        ranks = None
+        if search:
+            schools, ranks = snapshot.search_schools(schools, search)
+
+        found = None
+        if wanted is not None:
+            found = pick_by_ids(schools, wanted)
+        counts = None
+        if facet_names:
+            key = ("facets", snapshot.signature) + facet_key
+            counts = stats_cache.get(key)
+            if counts is None:
+                counts = record_facets(found.values() if wanted is not None else schools, facet_names)
+                stats_cache.set(key, counts)
+
+        if wanted is not None:
+            schools, next_cursor = [found[value] for value in wanted if value in found], None
+        else:
+            schools, next_cursor = paginate_records(schools, limit, skip=skip, cursor=cursor, ranks=ranks)
+        if projection is not None:
+            return projected_school_payload(schools, projection), next_cursor, found, counts
+        return school_list_payload(schools, snapshot_fragments(schools, children)), next_cursor, found, counts
+
+    payload, next_cursor, found, counts = await read(database, build, from_snapshot)
+    response = conditional_response(request, payload)
+    set_next_cursor(request, response, next_cursor)
+    if wanted is not None:
+        set_missing_ids(response, wanted, found)
+    if counts is not None:
+        response.headers["X-Facets"] = dump_json(counts).decode("utf-8")
+    return response
+
+
+@app.post("/api/v1/schools:batchGet", response_model=schemas.SchoolBatchResponse, tags=["Schools"])
+@limiter.limit(RateLimits.LIST)
+async def batch_get_schools(
+    request: Request,
+    batch: schemas.BatchGetRequest,
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated children to embed: campuses,faculties (default: all, empty: none)"
+    ),
+    database: Database = Depends(get_database)
+):
+    """Get many schools by ID in one request, in request order (Rate limit: 100/minute)"""
+    children = parse_include(include)
+
+    def build(db: Session) -> bytes:
+        found = fetch_by_ids(db.query(*SCHOOL_KEY_COLUMNS), models.School, batch.ids)
+        return school_batch_body(batch.ids, school_fragments(db, list(found.values()), children))
+
+    def from_snapshot(snapshot) -> bytes:
+        found = [snapshot.schools_by_id[value] for value in set(batch.ids) if value in snapshot.schools_by_id]
+        return school_batch_body(batch.ids, snapshot_fragments(found, children))
+
+    return Response(content=await read(database, build, from_snapshot), media_type="application/json")
 
 
 @app.get("/api/v1/schools/{school_id}", response_model=schemas.School, tags=["Schools"])
-@limiter.limit("200/minute")
-def get_school(
+@limiter.limit(RateLimits.DETAIL)
+async def get_school(
     request: Request,
     school_id: str, 
-    db: Session = Depends(get_db)
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated children to embed: campuses,faculties (default: all, empty: none)"
+    ),
+    database: Database = Depends(get_database)
 ):
     """Get school details by ID (Rate limit: 200/minute)"""
-    school = db.query(models.School).filter(models.School.id == school_id).first()
-    if not school:
-        raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
-    return school
+    children = parse_include(include)
+
+    def build(db: Session):
+        school = db.query(*SCHOOL_KEY_COLUMNS).filter(models.School.id == school_id).first()
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        body = school_fragments(db, [school], children).get(school_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        return make_payload(body, school.updated_at)
+
+    def from_snapshot(snapshot):
+        school = snapshot.schools_by_id.get(school_id)
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        return make_payload(snapshot_fragments([school], children)[school_id], school.updated_at)
+
+    key = ("school", school_id, tuple(sorted(children)))
+    payload = await cached(key, [school_tag(school_id)], lambda: read(database, build, from_snapshot))
+    return conditional_response(request, payload)
 
 
 @app.post("/api/v1/schools", response_model=schemas.School, status_code=201, tags=["Schools"])
-@limiter.limit("10/minute")
-def create_school(
+@limiter.limit(RateLimits.WRITE)
+async def create_school(
     request: Request,
     school: schemas.SchoolCreate, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Create a new school (Rate limit: 10/minute)"""
-    # Check if school ID already exists
-    existing = db.query(models.School).filter(models.School.id == school.id).first()
-    if existing:
-        raise HTTPException(status_code=400, detail=f"School with id '{school.id}' already exists")
-    
-    # Check if code already exists
-    existing_code = db.query(models.School).filter(models.School.code == school.code).first()
-    if existing_code:
-        raise HTTPException(status_code=400, detail=f"School with code '{school.code}' already exists")
-    
-    # Create school
-    db_school = models.School(
-        id=school.id,
-        code=school.code,
-        name=school.name,
-        logo_url=school.logo_url,
-        description=school.description,
-        type=school.type,
-        country=school.country,
-        contact=school.contact.dict(),
-        verified=school.metadata.verified,
-        created_at=school.metadata.created_at,
-        updated_at=school.metadata.updated_at
-    )
-    db.add(db_school)
-    db.flush()
-    
-    # Create campuses
-    for campus in school.campuses:
-        db_campus = models.Campus(
-            school_id=school.id,
-            name=campus.name,
-            address=campus.address,
-            is_main=campus.is_main
+    def create(db: Session) -> bytes:
+        # Check if school ID already exists
+        existing = db.query(models.School).filter(models.School.id == school.id).first()
+        if existing:
+            raise HTTPException(status_code=400, detail=f"School with id '{school.id}' already exists")
+        
+        # Check if code already exists
+        existing_code = db.query(models.School).filter(models.School.code == school.code).first()
+        if existing_code:
+            raise HTTPException(status_code=400, detail=f"School with code '{school.code}' already exists")
+        
+        # Create school
+        db_school = models.School(
+            id=school.id,
+            code=school.code,
+            name=school.name,
+            logo_url=school.logo_url,
+            description=school.description,
+            type=school.type,
+            country=school.country,
+            contact=school.contact.dict(),
+            verified=school.metadata.verified,
+            created_at=school.metadata.created_at,
+            updated_at=school.metadata.updated_at
         )
-        db.add(db_campus)
-    
-    # Create faculties
-    for faculty in school.faculties:
-        db_faculty = models.Faculty(
-            id=faculty.id,
-            school_id=school.id,
-            name=faculty.name,
-            code=faculty.code,
-            website=faculty.website,
-            programs=faculty.programs
-        )
-        db.add(db_faculty)
-    
-    db.commit()
-    db.refresh(db_school)
-    return db_school
+        db.add(db_school)
+        db.flush()
+        
+        # Create campuses
+        for campus in school.campuses:
+            db_campus = models.Campus(
+                school_id=school.id,
+                name=campus.name,
+                address=campus.address,
+                is_main=campus.is_main,
+                latitude=campus.latitude,
+                longitude=campus.longitude
+            )
+            db.add(db_campus)
+        
+        # Create faculties
+        for faculty in school.faculties:
+            db_faculty = models.Faculty(
+                id=faculty.id,
+                school_id=school.id,
+                name=faculty.name,
+                code=faculty.code,
+                website=faculty.website,
+                programs=faculty.programs
+            )
+            db.add(db_faculty)
+        
+        record_changes(db, [school.id])
+        db.commit()
+        db.refresh(db_school)
+        return store_fragment(db_school, set(SCHOOL_CHILDREN))
+
+    body = await database.run(create)
+    await refresh_snapshot()
+    suggest_store.expire()
+    response_cache.invalidate(school_tag(school.id))
+    return Response(content=body, status_code=201, media_type="application/json")
 
 
 @app.put("/api/v1/schools/{school_id}", response_model=schemas.School, tags=["Schools"])
-@limiter.limit("10/minute")
-def update_school(
+@limiter.limit(RateLimits.WRITE)
+async def update_school(
     request: Request,
     school_id: str, 
     school: schemas.SchoolCreate, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Update a school (Rate limit: 10/minute)"""
-    db_school = db.query(models.School).filter(models.School.id == school_id).first()
-    if not db_school:
-        raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
-    
-    # Update school fields
-    db_school.code = school.code
-    db_school.name = school.name
-    db_school.logo_url = school.logo_url
-    db_school.description = school.description
-    db_school.type = school.type
-    db_school.country = school.country
-    db_school.contact = school.contact.dict()
-    db_school.verified = school.metadata.verified
-    db_school.updated_at = school.metadata.updated_at
-    
-    # Delete old campuses and faculties
-    db.query(models.Campus).filter(models.Campus.school_id == school_id).delete()
-    db.query(models.Faculty).filter(models.Faculty.school_id == school_id).delete()
-    
-    # Add new campuses
-    for campus in school.campuses:
-        db_campus = models.Campus(
-            school_id=school_id,
-            name=campus.name,
-            address=campus.address,
-            is_main=campus.is_main
-        )
-        db.add(db_campus)
-    
-    # Add new faculties
-    for faculty in school.faculties:
-        db_faculty = models.Faculty(
-            id=faculty.id,
-            school_id=school_id,
-            name=faculty.name,
-            code=faculty.code,
-            website=faculty.website,
-            programs=faculty.programs
+    def update(db: Session) -> bytes:
+        db_school = db.query(models.School).filter(models.School.id == school_id).first()
+        if not db_school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        
+        # Same rules as bulkUpsert: the code and faculty ids must be free or already this school's
+        faculty_ids = [faculty.id for faculty in school.faculties]
+        conflicts = upsert_conflicts(
+            [{"id": school_id, "code": school.code, "faculties": [{"id": faculty_id} for faculty_id in faculty_ids]}],
+            dict(db.query(models.School.code, models.School.id).filter(models.School.code == school.code).all()),
+            dict(db.query(models.Faculty.id, models.Faculty.school_id).filter(models.Faculty.id.in_(faculty_ids)).all()),
         )
-        db.add(db_faculty)
-    
-    db.commit()
-    db.refresh(db_school)
-    return db_school
+        if conflicts:
+            raise HTTPException(status_code=409, detail=conflicts[0])
+        
+        # Update school fields
+        db_school.code = school.code
+        db_school.name = school.name
+        db_school.logo_url = school.logo_url
+        db_school.description = school.description
+        db_school.type = school.type
+        db_school.country = school.country
+        db_school.contact = school.contact.dict()
+        db_school.verified = school.metadata.verified
+        db_school.updated_at = school.metadata.updated_at
+        # Child changes below don't make the school row dirty by themselves
+        db_school.revision = models.new_revision()
+        
+        # Touch only the campuses and faculties that changed; the rest keep their ids
+        sync_children(db, db_school, school)
+        record_changes(db, [school_id])
+        
+        db.commit()
+        db.refresh(db_school)
+        return store_fragment(db_school, set(SCHOOL_CHILDREN))
+
+    body = await database.run(update)
+    await refresh_snapshot()
+    suggest_store.expire()
+    response_cache.invalidate(school_tag(school_id))
+    return Response(content=body, media_type="application/json")
 
 
 @app.delete("/api/v1/schools/{school_id}", tags=["Schools"])
-@limiter.limit("10/minute")
-def delete_school(
+@limiter.limit(RateLimits.WRITE)
+async def delete_school(
     request: Request,
     school_id: str, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Delete a school (Rate limit: 10/minute)"""
-    db_school = db.query(models.School).filter(models.School.id == school_id).first()
-    if not db_school:
-        raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
-    
-    db.delete(db_school)
-    db.commit()
+    def delete(db: Session):
+        db_school = db.query(models.School).filter(models.School.id == school_id).first()
+        if not db_school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        
+        db.delete(db_school)
+        record_changes(db, [school_id])
+        db.commit()
+
+    await database.run(delete)
+    await refresh_snapshot()
+    suggest_store.expire()
+    response_cache.invalidate(school_tag(school_id))
     return {"message": f"School '{school_id}' deleted successfully"}
 
 
+@app.post("/api/v1/schools:bulkUpsert", response_model=schemas.BulkUpsertResponse, tags=["Schools"])
+@limiter.limit(RateLimits.WRITE)
+async def bulk_upsert_schools(
+    request: Request,
+    batch: schemas.BulkUpsertRequest,
+    database: Database = Depends(get_database)
+):
+    """Create or update many schools in one transaction, with a status per school (Rate limit: 10/minute)"""
+    documents = [normalize_document(school.model_dump()) for school in batch.schools]
+
+    def written(results: list) -> list:
+        return [doc["id"] for doc, (status, _) in zip(documents, results) if status in ("created", "updated")]
+
+    def upsert(db: Session) -> list:
+        try:
+            results = upsert_documents(db, documents)
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(
+                status_code=409,
+                detail="Schools in the batch conflict with each other (e.g. swapping codes); nothing was written"
+            )
+        record_changes(db, written(results))
+        db.commit()
+        return results
+
+    results = await database.run(upsert)
+    school_ids = written(results)
+    if school_ids:
+        await refresh_snapshot()
+        suggest_store.expire()
+        response_cache.invalidate(*(school_tag(school_id) for school_id in school_ids))
+
+    counts = {status: 0 for status in ("created", "updated", "unchanged", "failed")}
+    for status, _ in results:
+        counts[status] += 1
+    return schemas.BulkUpsertResponse(
+        results=[
+            schemas.BulkUpsertItem(id=doc["id"], status=status, detail=detail)
+            for doc, (status, detail) in zip(documents, results)
+        ],
+        **counts,
+    )
+
+
 # ============= FACULTIES ENDPOINTS =============
 
 @app.get("/api/v1/faculties", response_model=List[schemas.FacultyList], tags=["Faculties"])
-@limiter.limit("50/minute")
-def list_faculties(
+@limiter.limit(RateLimits.SEARCH)
+async def list_faculties(
     request: Request,
     skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
     limit: int = Query(100, ge=1, le=500),
     school_id: Optional[str] = Query(None, description="Filter by school ID"),
     search: Optional[str] = Query(None, description="Search in faculty name or code"),
-    db: Session = Depends(get_db)
+    program: Optional[str] = Query(
+        None, description="Only faculties teaching a program with this name, accents optional (e.g. khoa hoc may tinh)"
+    ),
+    ids: Optional[str] = Query(
+        None,
+        description=f"Comma-separated faculty ids (max {schemas.MAX_BATCH_IDS}), returned in request order "
+                    "without pagination; unknown ids are listed in X-Missing-Ids"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. id,name,programs (id is always included)"
+    ),
+    view: Optional[str] = Query(None, description="summary (id, name, code, school_id; default) or full"),
+    database: Database = Depends(get_database)
 ):
     """Get list of faculties with filters (Rate limit: 50/minute)"""
-    query = db.query(models.Faculty)
-    
-    if school_id:
-        query = query.filter(models.Faculty.school_id == school_id)
-    if search:
-        query = query.filter(
-            or_(
-                models.Faculty.name.ilike(f"%{search}%"),
-                models.Faculty.code.ilike(f"%{search}%")
-            )
-        )
-    
-    faculties = query.offset(skip).limit(limit).all()
-    return faculties
+    wanted = parse_ids(ids) if ids is not None else None
+    projection = parse_fields(fields, view, schemas.Faculty, FACULTY_VIEWS) or FACULTY_VIEWS["summary"]
+    if projection == FACULTY_VIEWS["summary"]:
+        adapter = faculty_list_adapter
+    else:
+        adapter = projection_adapter(schemas.Faculty, projection)
+
+    def build(db: Session):
+        query = db.query(models.Faculty).options(*projection_options(models.Faculty, projection, {}))
+        
+        if school_id:
+            query = query.filter(models.Faculty.school_id == school_id)
+        if program:
+            # Through the programs index, not by scanning the JSON column
+            teaching = apply_search(db.query(models.Program.faculty_id), models.Program, program, db.bind.dialect.name)
+            query = query.filter(models.Faculty.id.in_(teaching.order_by(None).statement))
+        rank = None
+        if search:
+            # Accent-insensitive full-text match, best matches first
+            query = apply_search(query, models.Faculty, search, db.bind.dialect.name)
+            rank = search_rank(models.Faculty, search, db.bind.dialect.name)
+        
+        found = None
+        if wanted is not None:
+            found = fetch_by_ids(query, models.Faculty, wanted)
+            faculties, next_cursor = [found[value] for value in wanted if value in found], None
+        else:
+            faculties, next_cursor = paginate(query, models.Faculty, limit, skip=skip, cursor=cursor, rank=rank)
+        return make_payload(serialize(adapter, faculties)), next_cursor, found
+
+    def from_snapshot(snapshot):
+        faculties = snapshot.find_faculties(school_id)
+        if program:
+            teaching = snapshot.faculties_teaching(program)
+            faculties = [faculty for faculty in faculties if faculty.id in teaching]
+        ranks = None
+        if search:
+            faculties, ranks = snapshot.search_faculties(faculties, search)
+
+        found = None
+        if wanted is not None:
+            found = pick_by_ids(faculties, wanted)
+            faculties, next_cursor = [found[value] for value in wanted if value in found], None
+        else:
+            faculties, next_cursor = paginate_records(faculties, limit, skip=skip, cursor=cursor, ranks=ranks)
+        return make_payload(serialize(adapter, faculties)), next_cursor, found
+
+    payload, next_cursor, found = await read(database, build, from_snapshot)
+    response = conditional_response(request, payload)
+    set_next_cursor(request, response, next_cursor)
+    if wanted is not None:
+        set_missing_ids(response, wanted, found)
+    return response
+
+
+@app.post("/api/v1/faculties:batchGet", response_model=schemas.FacultyBatchResponse, tags=["Faculties"])
+@limiter.limit(RateLimits.LIST)
+async def batch_get_faculties(
+    request: Request,
+    batch: schemas.BatchGetRequest,
+    database: Database = Depends(get_database)
+):
+    """Get many faculties by ID in one request, in request order (Rate limit: 100/minute)"""
+    def build(db: Session) -> bytes:
+        found = fetch_by_ids(db.query(models.Faculty), models.Faculty, batch.ids)
+        results = [
+            {"id": value, "found": value in found, "faculty": found.get(value)}
+            for value in batch.ids
+        ]
+        return serialize(faculty_batch_adapter, {"results": results})
+
+    def from_snapshot(snapshot) -> bytes:
+        found = snapshot.faculties_by_id
+        results = [
+            {"id": value, "found": value in found, "faculty": found.get(value)}
+            for value in batch.ids
+        ]
+        return serialize(faculty_batch_adapter, {"results": results})
+
+    return Response(content=await read(database, build, from_snapshot), media_type="application/json")
 
 
 @app.get("/api/v1/faculties/{faculty_id}", response_model=schemas.Faculty, tags=["Faculties"])
-@limiter.limit("200/minute")
-def get_faculty(
+@limiter.limit(RateLimits.DETAIL)
+async def get_faculty(
     request: Request,
     faculty_id: str, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Get faculty details by ID (Rate limit: 200/minute)"""
-    faculty = db.query(models.Faculty).filter(models.Faculty.id == faculty_id).first()
-    if not faculty:
-        raise HTTPException(status_code=404, detail=f"Faculty with id '{faculty_id}' not found")
-    return faculty
+    def build(db: Session):
+        faculty = db.query(models.Faculty).filter(models.Faculty.id == faculty_id).first()
+        if not faculty:
+            raise HTTPException(status_code=404, detail=f"Faculty with id '{faculty_id}' not found")
+        return faculty.school_id, make_payload(serialize(faculty_adapter, faculty), faculty.school.updated_at)
+
+    def from_snapshot(snapshot):
+        faculty = snapshot.faculties_by_id.get(faculty_id)
+        if not faculty:
+            raise HTTPException(status_code=404, detail=f"Faculty with id '{faculty_id}' not found")
+        school = snapshot.schools_by_id[faculty.school_id]
+        return faculty.school_id, make_payload(serialize(faculty_adapter, faculty), school.updated_at)
+
+    payload = response_cache.get(("faculty", faculty_id))
+    if payload is None:
+        generation = response_cache.generation
+        owner_id, payload = await read(database, build, from_snapshot)
+        # Tagged with the owning school, whose writes replace all of its faculties
+        response_cache.set(("faculty", faculty_id), payload, [school_tag(owner_id)], generation=generation)
+    return conditional_response(request, payload)
 
 
 @app.get("/api/v1/schools/{school_id}/faculties", response_model=List[schemas.Faculty], tags=["Schools", "Faculties"])
-@limiter.limit("100/minute")
-def get_school_faculties(
+@limiter.limit(RateLimits.LIST)
+async def get_school_faculties(
     request: Request,
     school_id: str, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Get all faculties of a specific school (Rate limit: 100/minute)"""
-    # Check if school exists
-    school = db.query(models.School).filter(models.School.id == school_id).first()
-    if not school:
-        raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
-    
-    faculties = db.query(models.Faculty).filter(models.Faculty.school_id == school_id).all()
-    return faculties
+    def build(db: Session):
+        # Check if school exists
+        school = db.query(models.School).filter(models.School.id == school_id).first()
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        
+        faculties = db.query(models.Faculty).filter(models.Faculty.school_id == school_id).all()
+        return make_payload(serialize(faculties_adapter, faculties), school.updated_at)
+
+    def from_snapshot(snapshot):
+        school = snapshot.schools_by_id.get(school_id)
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        return make_payload(serialize(faculties_adapter, school.faculties), school.updated_at)
+
+    payload = await cached(
+        ("school_faculties", school_id), [school_tag(school_id)], lambda: read(database, build, from_snapshot)
+    )
+    return conditional_response(request, payload)
 
 
 @app.get("/api/v1/schools/{school_id}/campuses", response_model=List[schemas.Campus], tags=["Schools", "Campuses"])
-@limiter.limit("100/minute")
-def get_school_campuses(
+@limiter.limit(RateLimits.LIST)
+async def get_school_campuses(
     request: Request,
     school_id: str, 
-    db: Session = Depends(get_db)
+    database: Database = Depends(get_database)
 ):
     """Get all campuses of a specific school (Rate limit: 100/minute)"""
-    # Check if school exists
-    school = db.query(models.School).filter(models.School.id == school_id).first()
-    if not school:
-        raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
-    
-    campuses = db.query(models.Campus).filter(models.Campus.school_id == school_id).all()
-    return campuses
\ No newline at end of file
+    def build(db: Session):
+        # Check if school exists
+        school = db.query(models.School).filter(models.School.id == school_id).first()
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        
+        campuses = db.query(models.Campus).filter(models.Campus.school_id == school_id).all()
+        return make_payload(serialize(campuses_adapter, campuses), school.updated_at)
+
+    def from_snapshot(snapshot):
+        school = snapshot.schools_by_id.get(school_id)
+        if not school:
+            raise HTTPException(status_code=404, detail=f"School with id '{school_id}' not found")
+        return make_payload(serialize(campuses_adapter, school.campuses), school.updated_at)
+
+    payload = await cached(
+        ("school_campuses", school_id), [school_tag(school_id)], lambda: read(database, build, from_snapshot)
+    )
+    return conditional_response(request, payload)
+
+
+# ============= CAMPUSES ENDPOINTS =============
+
+def nearby_rows(matches: list) -> list:
+    return [
+        {**{name: getattr(campus, name) for name in ("id", "school_id", *CAMPUS_FIELDS)},
+         "distance_km": round(distance, 3)}
+        for distance, campus in matches
+    ]
+
+
+@app.get("/api/v1/campuses/nearby", response_model=List[schemas.NearbyCampus], tags=["Campuses"])
+@limiter.limit(RateLimits.SEARCH)
+async def nearby_campuses(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude in WGS84 degrees"),
+    lon: float = Query(..., ge=-180, le=180, description="Longitude in WGS84 degrees"),
+    radius_km: Optional[float] = Query(None, gt=0, description="Only campuses within this distance"),
+    limit: int = Query(20, ge=1, le=100, description="Return at most the `limit` nearest campuses"),
+    database: Database = Depends(get_database)
+):
+    """Find the campuses nearest to a point, closest first (Rate limit: 50/minute)"""
+    def build(db: Session):
+        # Rank (id, latitude, longitude) rows; only the `limit` results are loaded in full
+        located = db.query(models.Campus.id, models.Campus.latitude, models.Campus.longitude)
+
+        def find(box):
+            return apply_box(located, models.Campus, box, db.bind.dialect.name).all()
+
+        matches = nearest(find, lat, lon, limit, radius_km)
+        campuses = fetch_by_ids(db.query(models.Campus), models.Campus, [row.id for _, row in matches])
+        matches = [(distance, campuses[row.id]) for distance, row in matches]
+        return make_payload(serialize(nearby_adapter, nearby_rows(matches)))
+
+    def from_snapshot(snapshot):
+        matches = nearest(snapshot.find_campuses, lat, lon, limit, radius_km)
+        return make_payload(serialize(nearby_adapter, nearby_rows(matches)))
+
+    return conditional_response(request, await read(database, build, from_snapshot))
+
+
+# ============= PROGRAMS ENDPOINTS =============
+
+@app.get("/api/v1/programs", response_model=List[schemas.Program], tags=["Programs"])
+@limiter.limit(RateLimits.SEARCH)
+async def list_programs(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the previous page's X-Next-Cursor header"),
+    limit: int = Query(100, ge=1, le=500),
+    search: Optional[str] = Query(None, description="Program name, accents optional (e.g. khoa hoc may tinh)"),
+    school_id: Optional[str] = Query(None, description="Filter by school ID"),
+    database: Database = Depends(get_database)
+):
+    """Find programs by name, with the faculty and school teaching each (Rate limit: 50/minute)"""
+    def build(db: Session):
+        query = db.query(models.Program)
+        if school_id:
+            query = query.filter(models.Program.school_id == school_id)
+        rank = None
+        if search:
+            query = apply_search(query, models.Program, search, db.bind.dialect.name)
+            rank = search_rank(models.Program, search, db.bind.dialect.name)
+        programs, next_cursor = paginate(query, models.Program, limit, skip=skip, cursor=cursor, rank=rank)
+        return make_payload(serialize(programs_adapter, programs)), next_cursor
+
+    def from_snapshot(snapshot):
+        programs = snapshot.find_programs(school_id)
+        ranks = None
+        if search:
+            programs, ranks = snapshot.search_programs(programs, search)
+        programs, next_cursor = paginate_records(programs, limit, skip=skip, cursor=cursor, ranks=ranks, id_type=int)
+        return make_payload(serialize(programs_adapter, programs)), next_cursor
+
+    payload, next_cursor = await read(database, build, from_snapshot)
+    response = conditional_response(request, payload)
+    set_next_cursor(request, response, next_cursor)
+    return response
+
+
+# ============= AUTOCOMPLETE =============
+
+@app.get("/api/v1/suggest", response_model=List[schemas.Suggestion], tags=["Search"])
+@limiter.limit(RateLimits.SUGGEST)
+async def suggest(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="What the user typed so far, accents optional"),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    database: Database = Depends(get_database)
+):
+    """Autocomplete school/faculty names, codes and abbreviations (e.g. bk, cntt) (Rate limit: 600/minute)"""
+    if SNAPSHOT_MODE:
+        if snapshot_store.needs_check():
+            await run_in_threadpool(snapshot_store.check)
+        index = snapshot_store.current.suggestions
+    elif suggest_store.needs_check():
+        index = await database.run(suggest_store.check)
+    else:
+        index = suggest_store.current
+    return conditional_response(request, index.suggest(q, limit))
+
+
+# ============= STATISTICS =============
+
+@app.get("/api/v1/stats", response_model=schemas.Stats, tags=["Stats"])
+@limiter.limit(RateLimits.LIST)
+async def get_stats(request: Request, database: Database = Depends(get_database)):
+    """Catalog-wide counts, computed once per data version (Rate limit: 100/minute)"""
+    def build(db: Session):
+        # Same read transaction for the version and the counts
+        key = ("stats", latest_version(db))
+        payload = stats_cache.get(key)
+        if payload is None:
+            payload = make_payload(dump_json(compute_stats(db)))
+            stats_cache.set(key, payload)
+        return payload
+
+    def from_snapshot(snapshot):
+        key = ("stats", snapshot.signature)
+        payload = stats_cache.get(key)
+        if payload is None:
+            payload = make_payload(dump_json(snapshot.stats))
+            stats_cache.set(key, payload)
+        return payload
+
+    payload = await read(database, build, from_snapshot)
+    return conditional_response(request, payload)
+
+
+# ============= CHANGE FEED =============
+
+@app.get("/api/v1/changes", response_model=schemas.ChangesResponse, tags=["Sync"])
+@limiter.limit(RateLimits.LIST)
+async def list_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="`version` of the previous response; 0 for everything"),
+    limit: int = Query(100, ge=1, le=500, description="Max number of changes to return"),
+    database: Database = Depends(get_database)
+):
+    """Schools created, updated or deleted after version `since`, oldest first (Rate limit: 100/minute)
+
+    Each school appears once with its current document, or `deleted: true`.
+    Repeat with `since` set to the returned `version` until `has_more` is false.
+    """
+    def build(db: Session) -> bytes:
+        # Same read transaction for the log and the documents
+        rows = (
+            db.query(models.Change.version, models.Change.school_id)
+            .filter(models.Change.version > since)
+            .order_by(models.Change.version)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not rows:
+            latest = latest_version(db)
+            if since > latest:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"'since' is ahead of the change log (latest version {latest}); resync from since=0"
+                )
+
+        # Latest change per school, in version order
+        versions = {}
+        for row in rows:
+            versions.pop(row.school_id, None)
+            versions[row.school_id] = row.version
+        keys = db.query(*SCHOOL_KEY_COLUMNS).filter(models.School.id.in_(list(versions))).all()
+        fragments = school_fragments(db, keys, set(SCHOOL_CHILDREN))
+
+        changes = [
+            b'{"version":' + dump_json(version) + b',"id":' + dump_json(school_id)
+            + (b',"deleted":false,"school":' + fragments[school_id] if school_id in fragments
+               else b',"deleted":true,"school":null') + b"}"
+            for school_id, version in versions.items()
+        ]
+        return (
+            b'{"version":' + dump_json(rows[-1].version if rows else since)
+            + b',"has_more":' + dump_json(has_more)
+            + b',"changes":' + json_array(changes) + b"}"
+        )
+
+    # The change log is not part of the snapshot; always read the database
+    body = await database.run(build)
+    return conditional_response(request, make_payload(body), cache_control="no-cache")
+
+
+# ============= EXPORT =============
+
+@app.get("/api/v1/export", tags=["Export"])
+@limiter.limit(RateLimits.EXPORT)
+async def export_schools(request: Request):
+    """Stream the full catalog as NDJSON, one data/*.json school per line (Rate limit: 10/minute)
+
+    The body is brotli- or gzip-compressed as negotiated with `Accept-Encoding`.
+    """
+    chunks = ndjson_chunks(iter_documents())
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        chunks = brotli_chunks(chunks) if encoding == "br" else gzip_chunks(chunks)
+        headers["Content-Encoding"] = encoding
+    return StreamingResponse(chunks, media_type="application/x-ndjson", headers=headers)
+
+
+# ============= SYSTEM ENDPOINTS =============
+
+@app.get("/metrics", tags=["System"])
+@limiter.limit(RateLimits.HEALTH)
+async def metrics(request: Request):
+    """Prometheus metrics of this worker process (Rate limit: 500/minute)"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/v1/cache/stats", tags=["System"])
+@limiter.limit(RateLimits.HEALTH)
+async def cache_stats(request: Request):
+    """Response, fragment, compressed body and stats cache hit/miss/eviction counters (Rate limit: 500/minute)"""
+    return dict(
+        response_cache.stats(),
+        fragments=fragment_cache.stats(),
+        compressed=compressed_cache.stats(),
+        stats=stats_cache.stats(),
+    )
@@ -0,0 +1,285 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Iterable, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.cache import compressed_cache, fragment_cache, response_cache, stats_cache
+from app.database import env_flag
+
+# Add a Server-Timing header (db, serialize, app) to every response
+SERVER_TIMING = env_flag("SERVER_TIMING", "1")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# A jump in this distribution for one route is the signature of an N+1 query
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+PREFIX = "schools_api_"
+
+
+# ============= METRIC TYPES =============
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus exposition format"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+            counts[position] += 1
+            counts[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((labels, list(counts)) for labels, counts in self._values.items())
+        for labels, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Collector:
+    """Samples computed at scrape time, e.g. from cache statistics"""
+
+    def __init__(self, name: str, documentation: str, type: str, labelnames: Tuple[str, ...],
+                 collect: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self.name = PREFIX + name
+        self.documentation = documentation
+        self.type = type
+        self.labelnames = labelnames
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte",
+    ("method", "route"),
+))
+requests_total = registry.register(Counter(
+    "http_requests_total", "Responses sent, by status code", ("method", "route", "status"),
+))
+db_queries = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed while handling one request",
+    ("route",), buckets=QUERY_COUNT_BUCKETS,
+))
+db_duration = registry.register(Histogram(
+    "db_duration_seconds", "Total SQL execution time of one request", ("route",),
+))
+serialization_duration = registry.register(Histogram(
+    "serialization_duration_seconds", "Total response serialization time of one request", ("route",),
+))
+rate_limit_rejections = registry.register(Counter(
+    "rate_limit_rejections_total", "Requests rejected with 429 by the rate limiter", ("route",),
+))
+
+
+CACHES = {
+    "response": response_cache,
+    "fragment": fragment_cache,
+    "compressed": compressed_cache,
+    "stats": stats_cache,
+}
+
+
+def _cache_samples(field: str):
+    def collect():
+        for name, cache in CACHES.items():
+            yield (name,), cache.stats()[field]
+    return collect
+
+
+for _field, _type, _documentation in (
+    ("hits", "counter", "Cache lookups that found an entry"),
+    ("misses", "counter", "Cache lookups that found nothing or an expired entry"),
+    ("evictions", "counter", "Entries dropped to stay within maxsize"),
+    ("size", "gauge", "Entries currently cached"),
+):
+    registry.register(Collector(
+        f"cache_{_field}" + ("_total" if _type == "counter" else ""), _documentation, _type,
+        ("cache",), _cache_samples(_field),
+    ))
+
+
+# ============= PER-REQUEST TIMING =============
+
+class RequestTiming:
+    """Mutable per-request accumulator; shared with threadpool workers through a ContextVar"""
+
+    __slots__ = ("started", "db_queries", "db_seconds", "serialize_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+    def server_timing(self) -> str:
+        elapsed = (time.perf_counter() - self.started) * 1000
+        return (
+            f'db;dur={self.db_seconds * 1000:.2f};desc="queries={self.db_queries}", '
+            f"serialize;dur={self.serialize_seconds * 1000:.2f}, "
+            f"app;dur={elapsed:.2f}"
+        )
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar("current_timing", default=None)
+
+
+class measure_serialization:
+    """`with measure_serialization():` adds the block's duration to the current request"""
+
+    __slots__ = ("started",)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        timing = current_timing.get()
+        if timing is not None:
+            timing.serialize_seconds += time.perf_counter() - self.started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    timing = current_timing.get()
+    if timing is not None:
+        timing.db_queries += 1
+        timing.db_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine):
+    """Count and time every statement run on `engine` (a sync Engine or AsyncEngine.sync_engine)"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_label(scope) -> str:
+    """Route template (bounded cardinality), not the raw path"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# ============= MIDDLEWARE =============
+
+class TimingMiddleware:
+    """Pure ASGI middleware: records per-route metrics and adds a Server-Timing header.
+
+    Runs as plain ASGI rather than BaseHTTPMiddleware so streaming responses
+    (the export) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", timing.server_timing().encode("latin-1")))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_timing.reset(token)
+            route = route_label(scope)
+            request_duration.observe((scope["method"], route), time.perf_counter() - timing.started)
+            requests_total.inc((scope["method"], route, str(status)))
+            db_queries.observe((route,), timing.db_queries)
+            db_duration.observe((route,), timing.db_seconds)
+            serialization_duration.observe((route,), timing.serialize_seconds)
@@ -0,0 +1,82 @@
+from sqlalchemy import inspect, select, text
+from sqlalchemy.engine import Engine
+
+from app.documents import program_rows
+from app.geo import ensure_spatial_index
+from app.models import Base, Faculty, Program
+from app.search import ensure_search_index
+
+# Superseded by the (..., id) school indexes, which also serve the keyset order
+OBSOLETE_INDEXES = ("ix_schools_country_type_verified", "ix_schools_type_verified", "ix_schools_verified")
+
+
+def add_missing_columns(engine: Engine):
+    """Add model columns that databases created by older versions don't have yet.
+
+    Only nullable columns without server defaults are expected here; existing
+    rows get NULL, which every reader treats as "unknown".
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+
+def create_missing_indexes(engine: Engine):
+    """Create model indexes that older databases don't have; create_all() skips existing tables"""
+    created = False
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    created = True
+        if created and engine.dialect.name == "sqlite":
+            # Refresh planner statistics for the new indexes
+            conn.execute(text("PRAGMA optimize"))
+
+
+def drop_obsolete_indexes(engine: Engine):
+    """Drop indexes replaced by the current models; create_missing_indexes() only adds"""
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def backfill_programs(engine: Engine):
+    """Fill the programs index from Faculty.programs in databases created before it existed"""
+    with engine.begin() as conn:
+        if conn.execute(select(Program.id).limit(1)).first() is not None:
+            return
+        faculties = conn.execute(
+            select(Faculty.id, Faculty.school_id, Faculty.programs).order_by(Faculty.school_id, Faculty.id)
+        ).mappings().all()
+        rows = program_rows(faculties)
+        if rows:
+            conn.execute(Program.__table__.insert(), rows)
+
+
+def seed_change_log(engine: Engine):
+    """Log every existing school once when the change log is new, so `since=0` covers the whole catalog"""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT 1 FROM changes LIMIT 1")).first() is None:
+            conn.execute(text("INSERT INTO changes (school_id) SELECT id FROM schools ORDER BY id"))
+
+
+def upgrade(engine: Engine):
+    """Bring any database, new or created by an older version, up to the current schema"""
+    Base.metadata.create_all(bind=engine)
+    # Before the generic step: search_text needs a backfill when it is added
+    ensure_search_index(engine)
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
+    drop_obsolete_indexes(engine)
+    # After add_missing_columns: the triggers read the coordinate columns
+    ensure_spatial_index(engine)
+    backfill_programs(engine)
+    seed_change_log(engine)
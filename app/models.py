@@ -1,6 +1,16 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, ForeignKey, JSON
+import time
+
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, Float, Text, ForeignKey, Index, JSON
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.documents import program_rows
+from app.search import build_search_text
+
+
+def new_revision() -> int:
+    """Version stamp for a school row, changed on every write"""
+    return time.time_ns()
 
 
 class School(Base):
@@ -22,20 +32,42 @@ class School(Base):
     created_at = Column(String(50))
     updated_at = Column(String(50))
     
+    # Diacritics-folded name + code, indexed by schools_fts (see app/search.py)
+    search_text = Column(Text)
+    
+    # Bumped whenever the school or its children change; keys cached JSON fragments
+    revision = Column(BigInteger, default=new_revision, onupdate=new_revision)
+    
     # Relationships
     campuses = relationship("Campus", back_populates="school", cascade="all, delete-orphan")
     faculties = relationship("Faculty", back_populates="school", cascade="all, delete-orphan")
+    
+    # One per combination of the list_schools filters, each ending in id: the equality
+    # columns must be exactly the filters for the rows to come out in keyset (id) order
+    __table_args__ = (
+        Index("ix_schools_country_type_verified_id", "country", "type", "verified", "id"),
+        Index("ix_schools_country_type_id", "country", "type", "id"),
+        Index("ix_schools_country_verified_id", "country", "verified", "id"),
+        Index("ix_schools_country_id", "country", "id"),
+        Index("ix_schools_type_verified_id", "type", "verified", "id"),
+        Index("ix_schools_type_id", "type", "id"),
+        Index("ix_schools_verified_id", "verified", "id"),
+    )
 
 
 class Campus(Base):
     __tablename__ = "campuses"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    school_id = Column(String, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False)
+    school_id = Column(String, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(100), nullable=False)
     address = Column(Text, nullable=False)
     is_main = Column(Boolean, default=False)
     
+    # WGS84 degrees, optional; indexed by campuses_rtree (see app/geo.py)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    
     school = relationship("School", back_populates="campuses")
 
 
@@ -43,7 +75,8 @@ class Faculty(Base):
     __tablename__ = "faculties"
     
     id = Column(String, primary_key=True)
-    school_id = Column(String, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False)
+    # Plain index: entries stay in rowid (file) order, which is the order faculties are served in
+    school_id = Column(String, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     code = Column(String(10))
     website = Column(String(500))
@@ -51,4 +84,65 @@ class Faculty(Base):
     # Programs stored as JSON array
     programs = Column(JSON)  # ["Toán học", "Khoa học máy tính", ...]
     
+    # Diacritics-folded name + code, indexed by faculties_fts (see app/search.py)
+    search_text = Column(Text)
+    
     school = relationship("School", back_populates="faculties")
+
+
+class Program(Base):
+    """One row per entry of Faculty.programs: the inverted index behind program search.
+
+    Derived data, rewritten whenever a faculty's programs change; the JSON
+    column stays the source of the served documents.
+    """
+    __tablename__ = "programs"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    faculty_id = Column(String, ForeignKey("faculties.id", ondelete="CASCADE"), nullable=False, index=True)
+    school_id = Column(String, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String(255), nullable=False)
+    
+    # Diacritics-folded name, indexed by programs_fts (see app/search.py)
+    search_text = Column(Text)
+
+
+class Change(Base):
+    """Append-only log of school writes; mirrors sync from the last `version` they saw"""
+    __tablename__ = "changes"
+    
+    # AUTOINCREMENT: versions only grow, even after the newest rows are deleted
+    version = Column(Integer, primary_key=True, autoincrement=True)
+    # No foreign key: deleted schools stay in the log
+    school_id = Column(String, nullable=False)
+    
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+# Keep the search shadow columns in sync on every ORM insert/update
+@event.listens_for(School, "before_insert")
+@event.listens_for(School, "before_update")
+@event.listens_for(Faculty, "before_insert")
+@event.listens_for(Faculty, "before_update")
+def _update_search_text(mapper, connection, target):
+    target.search_text = build_search_text(target.name, target.code)
+
+
+# Keep the programs index in sync with ORM writes; the importer writes it with Core
+@event.listens_for(Faculty, "after_insert")
+@event.listens_for(Faculty, "after_update")
+def _sync_programs(mapper, connection, target):
+    if not inspect(target).attrs.programs.history.has_changes():
+        return
+    programs = Program.__table__
+    connection.execute(programs.delete().where(programs.c.faculty_id == target.id))
+    rows = program_rows([{"id": target.id, "school_id": target.school_id, "programs": target.programs}])
+    if rows:
+        connection.execute(programs.insert(), rows)
+
+
+@event.listens_for(Faculty, "after_delete")
+def _delete_programs(mapper, connection, target):
+    # Also covered by ON DELETE CASCADE where foreign keys are enforced
+    programs = Program.__table__
+    connection.execute(programs.delete().where(programs.c.faculty_id == target.id))
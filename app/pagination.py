@@ -0,0 +1,124 @@
+import base64
+import json
+from bisect import bisect_right
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import and_, or_
+
+
+# ============= CURSOR ENCODING =============
+
+def encode_cursor(key: dict) -> str:
+    """Encode the sort key of the last row of a page as an opaque, URL-safe token"""
+    raw = json.dumps(key, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, id_type: type = str) -> dict:
+    """Decode a token produced by `encode_cursor`, rejecting anything malformed.
+
+    `id_type` is the Python type of the paginated model's primary key.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        key = None
+    # bool is an int subclass, but never a valid id
+    if not isinstance(key, dict) or not isinstance(key.get("id"), id_type) or isinstance(key.get("id"), bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+# ============= KEYSET PAGINATION =============
+
+def paginate(query, model, limit: int, skip: int = 0, cursor: Optional[str] = None, rank=None):
+    """Return (rows, next_cursor) for a query ordered by (rank, id) or by id alone.
+
+    `query` may select `model` entities or plain columns including `model.id`.
+
+    With a cursor the query seeks past the last row of the previous page
+    instead of scanning `skip` rows, so deep pages cost the same as the first.
+    """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either 'cursor' or 'skip', not both")
+
+    if cursor:
+        key = decode_cursor(cursor, model.id.type.python_type)
+        if rank is not None:
+            if not isinstance(key.get("rank"), (int, float)):
+                raise HTTPException(status_code=400, detail="Cursor does not belong to a search query")
+            query = query.filter(or_(
+                rank > key["rank"],
+                and_(rank == key["rank"], model.id > key["id"])
+            ))
+        else:
+            query = query.filter(model.id > key["id"])
+
+    if rank is not None:
+        query = query.add_columns(rank.label("search_rank"))
+    query = query.order_by(model.id)
+    if skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    ranks = None
+    if rank is not None:
+        # Unwrap entity rows; column rows keep the extra field, which is harmless
+        ranks = [row.search_rank for row in rows]
+        rows = [row[0] if isinstance(row[0], model) else row for row in rows]
+
+    next_cursor = None
+    if has_more:
+        key = {"id": rows[-1].id}
+        if ranks is not None:
+            key["rank"] = ranks[-1]
+        next_cursor = encode_cursor(key)
+
+    return rows, next_cursor
+
+
+def paginate_records(records: Sequence, limit: int, skip: int = 0, cursor: Optional[str] = None,
+                     ranks: Optional[Sequence] = None, id_type: type = str):
+    """In-memory `paginate` for records already sorted by (rank, id), or by id when `ranks` is None.
+
+    Accepts and produces the same cursors as `paginate`; `id_type` is the type of `record.id`.
+    """
+    if cursor and skip:
+        raise HTTPException(status_code=400, detail="Use either 'cursor' or 'skip', not both")
+
+    start = skip
+    if cursor:
+        key = decode_cursor(cursor, id_type)
+        if ranks is not None:
+            if not isinstance(key.get("rank"), (int, float)):
+                raise HTTPException(status_code=400, detail="Cursor does not belong to a search query")
+            keys = list(zip(ranks, (record.id for record in records)))
+            start = bisect_right(keys, (key["rank"], key["id"]))
+        else:
+            start = bisect_right([record.id for record in records], key["id"])
+
+    end = start + limit
+    rows = list(records[start:end])
+    next_cursor = None
+    if len(records) > end:
+        key = {"id": rows[-1].id}
+        if ranks is not None:
+            key["rank"] = ranks[end - 1]
+        next_cursor = encode_cursor(key)
+
+    return rows, next_cursor
+
+
+def set_next_cursor(request: Request, response: Response, next_cursor: Optional[str]):
+    """Advertise the next page via `X-Next-Cursor` and an RFC 8288 `Link` header"""
+    if next_cursor is None:
+        return
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=next_cursor)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
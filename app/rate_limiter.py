@@ -1,12 +1,192 @@
+import ipaddress
+import os
+import sqlite3
+import threading
+import time
+from math import floor
+
+from fastapi import Request
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+# memory:// (per worker), sqlite:///./ratelimit.db (shared by all workers on a host)
+# or redis://host:6379/0 (shared across hosts, needs the `redis` package)
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+# sliding-window-counter: O(1) per request, smooths bursts at window boundaries
+RATE_LIMIT_STRATEGY = os.getenv("RATE_LIMIT_STRATEGY", "sliding-window-counter")
+# Behind Cloudflare every request comes from the tunnel; the real client is in CF-Connecting-IP.
+# Off by default: anyone reaching the app directly could set the header and pick their own bucket
+RATE_LIMIT_TRUST_CF = os.getenv("RATE_LIMIT_TRUST_CF", "0").lower() in ("1", "true", "yes")
+# Peers allowed to set CF-Connecting-IP (addresses or CIDR ranges); cloudflared runs on the same host
+RATE_LIMIT_TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "127.0.0.1,::1").split(",") if network.strip()
+]
+
 
 class RateLimits:
     """Các mức giới hạn cho từng loại endpoint"""
-    
-    SEARCH = "50/minute"    
-    LIST = "100/minute"      
-    DETAIL = "200/minute"     
-    HEALTH = "500/minute"       
\ No newline at end of file
+
+    SUGGEST = "600/minute"      # one request per keystroke
+    SEARCH = "50/minute"
+    LIST = "100/minute"
+    DETAIL = "200/minute"
+    HEALTH = "500/minute"
+    WRITE = "10/minute"         # POST/PUT/DELETE
+    EXPORT = "10/minute"        # full catalog dump
+
+
+def is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """Rate limit key: the Cloudflare-reported client address when a trusted proxy sent it, else the socket peer"""
+    peer = get_remote_address(request)
+    if RATE_LIMIT_TRUST_CF and is_trusted_proxy(peer):
+        forwarded = request.headers.get("cf-connecting-ip", "").strip()
+        try:
+            return str(ipaddress.ip_address(forwarded))
+        except ValueError:
+            pass
+    return peer
+
+
+# ============= SQLITE STORAGE =============
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters in a SQLite file shared by every worker process on the host.
+
+    Each hit is one short write transaction touching at most two primary-key
+    rows, so the cost per request is constant. Registered for `sqlite:///path`.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    # Purge expired counters every N writes
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, uri: str = "sqlite:///./ratelimit.db", wrap_exceptions: bool = False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # sqlite:///./ratelimit.db -> ./ratelimit.db, sqlite:////var/lib/x.db -> /var/lib/x.db
+        self.path = uri[len("sqlite:///"):] if uri.startswith("sqlite:///") else uri.split("://", 1)[1]
+        self._local = threading.local()
+        self._writes = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            # Created on first use rather than in __init__, so building the limiter does no I/O
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at ON rate_limits (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    def _get(self, conn, key: str, now: float):
+        row = conn.execute(
+            "SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?", (key, now)
+        ).fetchone()
+        return row if row else (0, 0.0)
+
+    def _incr(self, conn, key: str, expiry: float, amount: int, now: float) -> int:
+        conn.execute(
+            "INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET "
+            "count = CASE WHEN expires_at > ? THEN count + excluded.count ELSE excluded.count END, "
+            "expires_at = CASE WHEN expires_at > ? THEN expires_at ELSE excluded.expires_at END",
+            (key, amount, now + expiry, now, now)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_INTERVAL == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expires_at <= ?", (now,))
+        return self._get(conn, key, now)[0]
+
+    # Fixed / moving window API
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return self._incr(conn, key, expiry, amount, time.time())
+
+    def get(self, key: str) -> int:
+        return self._get(self._connection(), key, time.time())[0]
+
+    def get_expiry(self, key: str) -> float:
+        expires_at = self._get(self._connection(), key, time.time())[1]
+        return expires_at or time.time()
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    # Sliding window counter API
+
+    def _sliding_window(self, conn, key: str, expiry: int, now: float):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(conn, previous_key, now)[0]
+        current_count = self._get(conn, current_key, now)[0]
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        conn = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE serializes check-and-increment across worker processes
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(conn, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            _, current_key = self.sliding_window_keys(key, expiry, now)
+            # Twice the window: the counter is still read as "previous" during the next window
+            self._incr(conn, current_key, 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key: str, expiry: int):
+        return self._sliding_window(self._connection(), key, expiry, time.time())
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM rate_limits WHERE key IN (?, ?)", (previous_key, current_key))
+
+
+limiter = Limiter(
+    key_func=client_ip,
+    storage_uri=RATE_LIMIT_STORAGE_URI,
+    strategy=RATE_LIMIT_STRATEGY,
+)
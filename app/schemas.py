@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict
 
 
 # Contact Schema
@@ -14,6 +14,8 @@ class CampusBase(BaseModel):
     name: str
     address: str
     is_main: bool = False
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class Campus(CampusBase):
     id: int
@@ -23,6 +25,10 @@ class Campus(CampusBase):
         from_attributes = True
 
 
+class NearbyCampus(Campus):
+    distance_km: float
+
+
 # Faculty Schemas
 class FacultyBase(BaseModel):
     id: str
@@ -38,6 +44,17 @@ class Faculty(FacultyBase):
         from_attributes = True
 
 
+# Program Schema (one entry of a faculty's programs)
+class Program(BaseModel):
+    id: int
+    name: str
+    faculty_id: str
+    school_id: str
+    
+    class Config:
+        from_attributes = True
+
+
 # Metadata Schema
 class Metadata(BaseModel):
     verified: bool = False
@@ -93,3 +110,86 @@ class FacultyList(BaseModel):
     
     class Config:
         from_attributes = True
+
+
+# Batch lookup schemas
+MAX_BATCH_IDS = 100
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_IDS)
+
+
+class SchoolBatchItem(BaseModel):
+    id: str
+    found: bool
+    school: Optional[School] = None
+
+
+class SchoolBatchResponse(BaseModel):
+    results: List[SchoolBatchItem]
+
+
+class FacultyBatchItem(BaseModel):
+    id: str
+    found: bool
+    faculty: Optional[Faculty] = None
+
+
+class FacultyBatchResponse(BaseModel):
+    results: List[FacultyBatchItem]
+
+
+# Autocomplete schemas
+class Suggestion(BaseModel):
+    type: Literal["school", "faculty"]
+    id: str
+    name: str
+    school_id: Optional[str] = None
+
+
+# Bulk write schemas
+MAX_BULK_SCHOOLS = 500
+
+
+class BulkUpsertRequest(BaseModel):
+    schools: List[SchoolCreate] = Field(..., min_length=1, max_length=MAX_BULK_SCHOOLS)
+
+
+class BulkUpsertItem(BaseModel):
+    id: str
+    status: Literal["created", "updated", "unchanged", "failed"]
+    detail: Optional[str] = None
+
+
+class BulkUpsertResponse(BaseModel):
+    results: List[BulkUpsertItem]
+    created: int
+    updated: int
+    unchanged: int
+    failed: int
+
+
+# Change feed schemas
+class SchoolChange(BaseModel):
+    version: int
+    id: str
+    deleted: bool
+    school: Optional[School] = None
+
+
+class ChangesResponse(BaseModel):
+    version: int    # pass as `since` to get the following changes
+    has_more: bool
+    changes: List[SchoolChange]
+
+
+# Statistics schema
+class Stats(BaseModel):
+    schools: int
+    campuses: int
+    faculties: int
+    schools_by_country: Dict[str, int]
+    schools_by_type: Dict[str, int]
+    schools_by_verified: Dict[str, int]
+    faculties_per_school: Dict[str, int]
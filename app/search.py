@@ -0,0 +1,155 @@
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import false, inspect, literal_column, text, and_, column, table
+from sqlalchemy.engine import Engine
+
+# Indexed tables -> columns folded into their `search_text` shadow column
+SEARCH_TABLES = {
+    "schools": ("name", "code"),
+    "faculties": ("name", "code"),
+    "programs": ("name",),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ============= TEXT NORMALIZATION =============
+
+def fold(value: Optional[str]) -> str:
+    """Lowercase and strip Vietnamese diacritics: 'Bách Khoa Đà Nẵng' -> 'bach khoa da nang'"""
+    if not value:
+        return ""
+    # "đ" is a distinct letter in Unicode, not "d" + combining mark
+    value = value.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", value)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return unicodedata.normalize("NFC", stripped).lower()
+
+
+def tokenize(value: Optional[str]) -> list:
+    """Split a folded string into search tokens"""
+    return _TOKEN_RE.findall(fold(value))
+
+
+def build_search_text(*parts: Optional[str]) -> str:
+    """Build the folded shadow column value from the searchable fields of a row"""
+    return " ".join(tokenize(" ".join(part for part in parts if part)))
+
+
+def match_expression(term: str) -> Optional[str]:
+    """Turn user input into an FTS5 query: every token must match as a prefix"""
+    tokens = tokenize(term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def match_tokens(words, tokens) -> bool:
+    """In-memory equivalent of `match_expression`: every token prefixes some indexed word"""
+    return all(any(word.startswith(token) for word in words) for token in tokens)
+
+
+# ============= QUERYING =============
+
+# One TableClause per index so joins and rank columns refer to the same FROM
+FTS_TABLES = {
+    tablename: table(f"{tablename}_fts", column("rowid"), column("search_text"), column("rank"))
+    for tablename in SEARCH_TABLES
+}
+
+
+def apply_search(query, model, term: str, dialect: str):
+    """Filter an ORM query on `model` by `term`, ordered by relevance where the backend supports it"""
+    tablename = model.__tablename__
+    if dialect != "sqlite":
+        # No FTS5 outside SQLite: fall back to substring matching on the folded column
+        tokens = tokenize(term)
+        if not tokens:
+            return query.filter(false())
+        return query.filter(and_(*(model.search_text.like(f"%{token}%") for token in tokens)))
+
+    expression = match_expression(term)
+    if expression is None:
+        return query.filter(false())
+
+    fts = FTS_TABLES[tablename]
+    return (
+        query
+        .join(fts, fts.c.rowid == literal_column(f"{tablename}.rowid"))
+        .filter(fts.c.search_text.match(expression))
+        .order_by(fts.c.rank)
+    )
+
+
+def search_rank(model, term: str, dialect: str):
+    """Relevance column of a query built by `apply_search` (lower is better), or None.
+
+    None as well when `term` has no tokens: `apply_search` then joins no FTS table.
+    """
+    if dialect != "sqlite" or match_expression(term) is None:
+        return None
+    return FTS_TABLES[model.__tablename__].c.rank
+
+
+# ============= INDEX MAINTENANCE =============
+
+def _create_fts_sql(tablename: str) -> list:
+    fts = f"{tablename}_fts"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"search_text, content='{tablename}', tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tablename} BEGIN "
+        f"INSERT INTO {fts}(rowid, search_text) VALUES (new.rowid, new.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.rowid, old.search_text); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {tablename} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_text) VALUES ('delete', old.rowid, old.search_text); "
+        f"INSERT INTO {fts}(rowid, search_text) VALUES (new.rowid, new.search_text); END",
+    ]
+
+
+def backfill_search_text(conn, tablename: str):
+    """Recompute the shadow column for every row of `tablename`"""
+    columns = SEARCH_TABLES[tablename]
+    rows = conn.execute(text(f"SELECT rowid, {', '.join(columns)} FROM {tablename}")).fetchall()
+    if rows:
+        conn.execute(
+            text(f"UPDATE {tablename} SET search_text = :search_text WHERE rowid = :rid"),
+            [{"rid": row[0], "search_text": build_search_text(*row[1:])} for row in rows]
+        )
+
+
+def rebuild_search_index(conn):
+    """Rebuild FTS5 indexes from their content tables (e.g. after a bulk load or VACUUM)"""
+    if conn.dialect.name != "sqlite":
+        return
+    for tablename in SEARCH_TABLES:
+        conn.execute(text(f"INSERT INTO {tablename}_fts({tablename}_fts) VALUES ('rebuild')"))
+
+
+def ensure_search_index(engine: Engine):
+    """Add the shadow columns and FTS5 tables to databases created before search indexing"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for tablename in SEARCH_TABLES:
+            columns = {col["name"] for col in inspector.get_columns(tablename)}
+            if "search_text" not in columns:
+                conn.execute(text(f"ALTER TABLE {tablename} ADD COLUMN search_text TEXT"))
+                backfill_search_text(conn, tablename)
+
+        if engine.dialect.name != "sqlite":
+            return
+
+        created = False
+        for tablename in SEARCH_TABLES:
+            if f"{tablename}_fts" not in existing_tables:
+                created = True
+            for statement in _create_fts_sql(tablename):
+                conn.execute(text(statement))
+
+        if created:
+            rebuild_search_index(conn)
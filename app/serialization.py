@@ -0,0 +1,26 @@
+import json
+from typing import Iterable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+else:
+    DefaultJSONResponse = JSONResponse
+
+
+def dump_json(value) -> bytes:
+    """Compact UTF-8 JSON, via orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_array(fragments: Iterable[bytes]) -> bytes:
+    """Join already-serialized JSON values into a JSON array without re-encoding them"""
+    return b"[" + b",".join(fragments) + b"]"
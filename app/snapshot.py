@@ -0,0 +1,272 @@
+import math
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.database import SessionLocal, env_flag
+from app.geo import LatitudeIndex
+from app.models import Program, School
+from app.search import match_tokens, tokenize
+from app.stats import record_stats
+from app.suggest import SuggestIndex
+
+# Serve GET endpoints from an in-memory copy of the catalog instead of the database
+SNAPSHOT_MODE = env_flag("SNAPSHOT_MODE")
+# Seconds between checks for writes made by other workers or the importer
+SNAPSHOT_CHECK_INTERVAL = float(os.getenv("SNAPSHOT_CHECK_INTERVAL", "5"))
+
+
+# ============= RECORDS =============
+
+class Record:
+    """Immutable row with `__slots__`; read by the response schemas like an ORM object"""
+
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def replace(self, **changes):
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return type(self)(**fields)
+
+
+class CampusRecord(Record):
+    __slots__ = ("id", "school_id", "name", "address", "is_main", "latitude", "longitude")
+
+
+class FacultyRecord(Record):
+    __slots__ = ("id", "school_id", "name", "code", "website", "programs", "search_words")
+
+
+class ProgramRecord(Record):
+    __slots__ = ("id", "faculty_id", "school_id", "name", "search_words")
+
+
+class SchoolRecord(Record):
+    __slots__ = (
+        "id", "code", "name", "logo_url", "description", "type", "country", "contact",
+        "verified", "created_at", "updated_at", "revision", "search_words", "campuses", "faculties",
+    )
+
+
+def _campus_record(campus) -> CampusRecord:
+    return CampusRecord(
+        id=campus.id, school_id=campus.school_id, name=campus.name,
+        address=campus.address, is_main=campus.is_main,
+        latitude=campus.latitude, longitude=campus.longitude,
+    )
+
+
+def _faculty_record(faculty) -> FacultyRecord:
+    return FacultyRecord(
+        id=faculty.id, school_id=faculty.school_id, name=faculty.name, code=faculty.code,
+        website=faculty.website, programs=tuple(faculty.programs or ()),
+        search_words=tuple(tokenize(faculty.search_text)),
+    )
+
+
+def _program_record(program) -> ProgramRecord:
+    return ProgramRecord(
+        id=program.id, faculty_id=program.faculty_id, school_id=program.school_id, name=program.name,
+        search_words=tuple(tokenize(program.search_text)),
+    )
+
+
+def _school_record(school) -> SchoolRecord:
+    return SchoolRecord(
+        id=school.id, code=school.code, name=school.name, logo_url=school.logo_url,
+        description=school.description, type=school.type, country=school.country,
+        contact=dict(school.contact or {}), verified=school.verified,
+        created_at=school.created_at, updated_at=school.updated_at, revision=school.revision,
+        search_words=tuple(tokenize(school.search_text)),
+        # Loaded in the same order as the database path so both serialize identically
+        campuses=tuple(_campus_record(campus) for campus in school.campuses),
+        faculties=tuple(_faculty_record(faculty) for faculty in school.faculties),
+    )
+
+
+# ============= SNAPSHOT =============
+
+def _group(records, attribute: str) -> dict:
+    groups = {}
+    for record in records:
+        groups.setdefault(getattr(record, attribute), []).append(record)
+    return {key: tuple(values) for key, values in groups.items()}
+
+
+def _bm25(records, corpus, tokens: list, k1: float = 1.2, b: float = 0.75) -> list:
+    """FTS5's bm25() for prefix tokens, with row and token statistics taken from `corpus`.
+
+    Negative like SQLite's, so ascending order puts the best match first.
+    """
+    total = len(corpus)
+    average = sum(len(record.search_words) for record in corpus) / total
+    scores = [0.0] * len(records)
+    for token in tokens:
+        hits = sum(1 for record in corpus if any(word.startswith(token) for word in record.search_words))
+        idf = max(math.log((total - hits + 0.5) / (hits + 0.5)), 1e-6)
+        for position, record in enumerate(records):
+            frequency = sum(1 for word in record.search_words if word.startswith(token))
+            length = len(record.search_words)
+            scores[position] -= idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average))
+    return scores
+
+
+def _search(records, corpus, term: str):
+    """Records matching `term` and their ranks, ordered like the database path: (bm25, id)"""
+    tokens = tokenize(term)
+    if not tokens:
+        return [], []
+    matches = [record for record in records if match_tokens(record.search_words, tokens)]
+    if not matches:
+        return [], []
+    ranked = sorted(zip(_bm25(matches, corpus, tokens), matches), key=lambda match: (match[0], match[1].id))
+    return [record for _, record in ranked], [rank for rank, _ in ranked]
+
+
+class Snapshot:
+    """Read-only catalog with precomputed lookup indexes; never mutated after construction"""
+
+    __slots__ = (
+        "signature", "schools", "schools_by_id", "schools_by_code", "schools_by_country",
+        "schools_by_type", "schools_by_verified", "faculties", "faculties_by_id", "faculties_by_school",
+        "programs", "programs_by_school", "campuses_by_location", "suggestions", "stats",
+    )
+
+    def __init__(self, schools, programs, signature):
+        self.signature = signature
+        # Every sequence below is ordered by id, like the database path
+        self.schools = tuple(sorted(schools, key=lambda school: school.id))
+        self.schools_by_id = {school.id: school for school in self.schools}
+        self.schools_by_code = {school.code: school for school in self.schools}
+        self.schools_by_country = _group(self.schools, "country")
+        self.schools_by_type = _group(self.schools, "type")
+        self.schools_by_verified = _group(self.schools, "verified")
+        self.faculties = tuple(sorted(
+            (faculty for school in self.schools for faculty in school.faculties),
+            key=lambda faculty: faculty.id,
+        ))
+        self.faculties_by_id = {faculty.id: faculty for faculty in self.faculties}
+        self.faculties_by_school = _group(self.faculties, "school_id")
+        self.programs = tuple(sorted(programs, key=lambda program: program.id))
+        self.programs_by_school = _group(self.programs, "school_id")
+        self.campuses_by_location = LatitudeIndex(campus for school in self.schools for campus in school.campuses)
+        self.suggestions = SuggestIndex(self.schools, self.faculties)
+        self.stats = record_stats(self.schools)
+
+    def find_schools(self, code: Optional[str] = None, country: Optional[str] = None,
+                     type: Optional[str] = None, verified: Optional[bool] = None):
+        """Schools matching every given filter, scanning only the narrowest index"""
+        if code is not None:
+            school = self.schools_by_code.get(code)
+            candidates = (school,) if school else ()
+        else:
+            candidates = self.schools
+        if country is not None:
+            candidates = min(candidates, self.schools_by_country.get(country, ()), key=len)
+        if type is not None:
+            candidates = min(candidates, self.schools_by_type.get(type, ()), key=len)
+        if verified is not None:
+            candidates = min(candidates, self.schools_by_verified.get(verified, ()), key=len)
+        return [
+            school for school in candidates
+            if (code is None or school.code == code)
+            and (country is None or school.country == country)
+            and (type is None or school.type == type)
+            and (verified is None or school.verified == verified)
+        ]
+
+    def find_faculties(self, school_id: Optional[str] = None):
+        if school_id is not None:
+            return list(self.faculties_by_school.get(school_id, ()))
+        return list(self.faculties)
+
+    def find_programs(self, school_id: Optional[str] = None):
+        if school_id is not None:
+            return list(self.programs_by_school.get(school_id, ()))
+        return list(self.programs)
+
+    def find_campuses(self, box) -> list:
+        """Located campuses inside a (min_lat, max_lat, min_lon, max_lon) box"""
+        return self.campuses_by_location.find(box)
+
+    def faculties_teaching(self, term: str) -> set:
+        """Ids of faculties with a program matching every token of `term`"""
+        tokens = tokenize(term)
+        if not tokens:
+            return set()
+        return {program.faculty_id for program in self.programs if match_tokens(program.search_words, tokens)}
+
+    def search_schools(self, schools, term: str):
+        return _search(schools, self.schools, term)
+
+    def search_faculties(self, faculties, term: str):
+        return _search(faculties, self.faculties, term)
+
+    def search_programs(self, programs, term: str):
+        return _search(programs, self.programs, term)
+
+
+def snapshot_signature(db: Session) -> tuple:
+    """Changes whenever a school is added, removed or written (each write stamps a new revision)"""
+    return tuple(db.execute(select(func.count(School.id), func.max(School.revision))).one())
+
+
+def build_snapshot(db: Session) -> Snapshot:
+    """Load the whole catalog in four queries, inside one read transaction"""
+    with db.begin():
+        signature = snapshot_signature(db)
+        schools = db.scalars(
+            select(School).options(selectinload(School.campuses), selectinload(School.faculties))
+        ).all()
+        records = [_school_record(school) for school in schools]
+        programs = [_program_record(program) for program in db.scalars(select(Program))]
+    return Snapshot(records, programs, signature)
+
+
+class SnapshotStore:
+    """Holds the current snapshot; a rebuild swaps in a new object, so readers never lock"""
+
+    def __init__(self, check_interval: float = SNAPSHOT_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.current: Optional[Snapshot] = None
+        self.builds = 0
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force: bool = True) -> Snapshot:
+        """Rebuild now (after a write in this process), or only if the database changed"""
+        with self._lock:
+            with SessionLocal() as db:
+                if not force and self.current is not None:
+                    with db.begin():
+                        unchanged = snapshot_signature(db) == self.current.signature
+                    if unchanged:
+                        self._checked_at = time.monotonic()
+                        return self.current
+                snapshot = build_snapshot(db)
+            self.current = snapshot
+            self.builds += 1
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    def needs_check(self) -> bool:
+        return self.current is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def check(self) -> Snapshot:
+        """Pick up writes from other processes; callers racing a rebuild keep the current snapshot"""
+        if self.current is not None and self._lock.locked():
+            return self.current
+        return self.refresh(force=False)
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,135 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from app.database import DB_POOL_SIZE, SessionLocal, async_engine, engine
+from app.migrations import upgrade
+from app.rate_limiter import limiter
+from app.snapshot import SNAPSHOT_MODE, snapshot_store
+from app.suggest import suggest_store
+
+# GET requests answered once before taking traffic, filling the response/fragment/stats caches
+WARMUP_PATHS = [path.strip() for path in os.getenv("WARMUP_PATHS", "/api/v1/stats,/api/v1/schools").split(",") if path.strip()]
+# Pooled connections each worker opens (running the SQLite pragmas) before taking traffic
+WARMUP_CONNECTIONS = min(int(os.getenv("WARMUP_CONNECTIONS", "2")), DB_POOL_SIZE)
+
+logger = logging.getLogger("uvicorn.error")
+
+# Set once warm_up() has run in this process, or in the parent a worker was forked from
+_warmed = False
+
+
+@contextmanager
+def timed(timings: dict, step: str):
+    started = time.perf_counter()
+    yield
+    timings[step] = time.perf_counter() - started
+
+
+def _format(timings: dict) -> str:
+    return ", ".join(f"{step} {seconds * 1000:.1f} ms" for step, seconds in timings.items())
+
+
+# ============= WARM-UP =============
+
+async def _get(app, path: str) -> int:
+    """Run one GET through the router (no middleware, so /metrics stays clean); returns the status"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "app": app,
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"), "root_path": "", "headers": [(b"host", b"warmup")],
+        "client": ("127.0.0.1", 0), "server": ("warmup", 80),
+    }
+    status = 500
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app.router(scope, receive, send)
+    return status
+
+
+async def warm_up(app) -> dict:
+    """Schema upgrade, snapshot or suggest index, OpenAPI schema and warm-up requests; returns step times.
+
+    Runs before the server accepts connections, so the blocking calls below
+    hold up nothing. A preforking launcher runs it once in the parent; the
+    forked workers then skip it and share the result copy-on-write.
+    """
+    global _warmed
+    timings = {}
+    with timed(timings, "schema"):
+        upgrade(engine)
+    if SNAPSHOT_MODE:
+        with timed(timings, "snapshot"):
+            snapshot_store.refresh()
+    else:
+        with timed(timings, "suggest"), SessionLocal() as db:
+            suggest_store.check(db)
+    with timed(timings, "openapi"):
+        app.openapi()
+
+    enabled, limiter.enabled = limiter.enabled, False
+    try:
+        with timed(timings, "requests"):
+            for path in WARMUP_PATHS:
+                status = await _get(app, path)
+                if status != 200:
+                    logger.warning("Warm-up request GET %s returned %d", path, status)
+    finally:
+        limiter.enabled = enabled
+    _warmed = True
+    return timings
+
+
+# ============= CONNECTION POOL =============
+
+def prime_pool(count: int = WARMUP_CONNECTIONS):
+    """Check out `count` connections at once so the pool keeps that many open"""
+    connections = [engine.connect() for _ in range(count)]
+    for conn in connections:
+        conn.execute(text("SELECT 1"))
+        conn.close()
+
+
+async def prime_async_pool(count: int = WARMUP_CONNECTIONS):
+    connections = [await async_engine.connect() for _ in range(count)]
+    for conn in connections:
+        await conn.execute(text("SELECT 1"))
+        await conn.close()
+
+
+def after_fork():
+    """In a forked worker: forget the parent's pooled connections without closing them"""
+    engine.dispose(close=False)
+    if async_engine is not None:
+        async_engine.sync_engine.dispose(close=False)
+
+
+# ============= LIFESPAN =============
+
+async def start(app):
+    """Lifespan startup of one worker: warm up unless the parent already did, then fill the pool"""
+    started = time.perf_counter()
+    timings = {} if _warmed else await warm_up(app)
+    with timed(timings, "pool"):
+        prime_pool()
+        if async_engine is not None:
+            await prime_async_pool()
+    logger.info("Started in %.1f ms (%s)", (time.perf_counter() - started) * 1000, _format(timings))
+
+
+async def stop():
+    """Lifespan shutdown: close the pooled connections (open aiosqlite threads would block interpreter exit)"""
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,69 @@
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import func
+
+from app.models import Campus, Faculty, School
+
+# School columns that can be counted with `facets=`
+FACETS = ("country", "type", "verified")
+
+
+def facet_value(value) -> str:
+    """JSON object key for a facet value"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "null" if value is None else str(value)
+
+
+# ============= DATABASE =============
+
+def school_facets(query, names: Iterable[str]) -> dict:
+    """Counts per value of each facet over the schools a list_schools query matches (one GROUP BY each)"""
+    facets = {}
+    for name in names:
+        column = getattr(School, name)
+        rows = query.with_entities(column, func.count()).group_by(column).order_by(None)
+        facets[name] = dict(sorted((facet_value(value), count) for value, count in rows))
+    return facets
+
+
+def compute_stats(db) -> dict:
+    stats = {
+        "schools": db.query(func.count(School.id)).scalar(),
+        "campuses": db.query(func.count(Campus.id)).scalar(),
+        "faculties": db.query(func.count(Faculty.id)).scalar(),
+    }
+    for name, counts in school_facets(db.query(School.id), FACETS).items():
+        stats[f"schools_by_{name}"] = counts
+    per_school = (
+        db.query(School.id, func.count(Faculty.id))
+        .outerjoin(Faculty, Faculty.school_id == School.id)
+        .group_by(School.id)
+        .order_by(School.id)
+    )
+    stats["faculties_per_school"] = dict(per_school.all())
+    return stats
+
+
+# ============= SNAPSHOT RECORDS =============
+
+def record_facets(schools, names: Iterable[str]) -> dict:
+    """`school_facets` over already filtered snapshot records"""
+    return {
+        name: dict(sorted(Counter(facet_value(getattr(school, name)) for school in schools).items()))
+        for name in names
+    }
+
+
+def record_stats(schools) -> dict:
+    """`compute_stats` for snapshot records ordered by id"""
+    stats = {
+        "schools": len(schools),
+        "campuses": sum(len(school.campuses) for school in schools),
+        "faculties": sum(len(school.faculties) for school in schools),
+    }
+    for name, counts in record_facets(schools, FACETS).items():
+        stats[f"schools_by_{name}"] = counts
+    stats["faculties_per_school"] = {school.id: len(school.faculties) for school in schools}
+    return stats
@@ -0,0 +1,152 @@
+import math
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from heapq import heapify, heappop, heappush
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.changes import latest_version
+from app.conditional import Payload, make_payload
+from app.models import Faculty, School
+from app.search import tokenize
+from app.serialization import dump_json, json_array
+
+# Largest `limit`
+MAX_SUGGESTIONS = 20
+# Answers memoized per index, keyed by (query, limit)
+SUGGEST_MEMO_SIZE = int(os.getenv("SUGGEST_MEMO_SIZE", "4096"))
+# Seconds between checks for writes made by other workers or the importer
+SUGGEST_CHECK_INTERVAL = float(os.getenv("SUGGEST_CHECK_INTERVAL", "5"))
+
+# Key kinds, best first: "hcmus", "truong dai hoc ...", "bach khoa ...", "bk"
+CODE, NAME, WORD, INITIALS = range(4)
+
+
+def suggestion_keys(name: str, code: Optional[str]) -> list:
+    """(key, kind) pairs an entry is found by: its code, its name from each word on, and their initials"""
+    words = tokenize(name)
+    keys = [(" ".join(tokenize(code)), CODE)] if code else []
+    for start in range(len(words)):
+        keys.append((" ".join(words[start:]), NAME if start == 0 else WORD))
+        if len(words) - start >= 2:
+            keys.append(("".join(word[0] for word in words[start:]), INITIALS))
+    return keys
+
+
+class SuggestIndex:
+    """Diacritics-folded keys in a sorted array, with a min segment tree over their match scores.
+
+    A prefix is a contiguous range of keys (two bisects). Its best matches
+    come off the tree in score order, so a query costs O(limit * log n)
+    however many keys share the prefix. Exact keys rank first, then by key
+    kind, then schools before faculties and shorter names first.
+    """
+
+    __slots__ = ("keys", "entries", "size", "tree", "lookup")
+
+    def __init__(self, schools: Iterable, faculties: Iterable):
+        entries = [(0, school.name, school.id, None, school.code) for school in schools]
+        entries += [(1, faculty.name, faculty.id, faculty.school_id, faculty.code) for faculty in faculties]
+        # An entry's position is its tie-break rank
+        entries.sort(key=lambda entry: (entry[0], len(entry[1]), entry[1], entry[2]))
+        self.entries = [
+            dump_json({"type": "faculty" if kind else "school", "id": id, "name": name, "school_id": school_id})
+            for kind, name, id, school_id, _ in entries
+        ]
+
+        pairs = sorted(
+            (key, kind * len(entries) + position)
+            for position, (_, name, _, _, code) in enumerate(entries)
+            for key, kind in suggestion_keys(name, code)
+            if key
+        )
+        self.keys = [key for key, _ in pairs]
+        # Leaves hold the score of each key (kind, then entry position, as one int)
+        self.size = 1 << max(len(pairs) - 1, 0).bit_length()
+        self.tree = [math.inf] * (2 * self.size)
+        self.tree[self.size:self.size + len(pairs)] = [score for _, score in pairs]
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = min(self.tree[2 * node], self.tree[2 * node + 1])
+        self.lookup = lru_cache(maxsize=SUGGEST_MEMO_SIZE)(self._payload)
+
+    def _best(self, start: int, end: int, limit: int, found: dict):
+        """Add the entries of the best-scored keys in [start, end) to `found` until it holds `limit`"""
+        heap = []
+        left, right = start + self.size, end + self.size
+        while left < right:
+            if left & 1:
+                heap.append((self.tree[left], left))
+                left += 1
+            if right & 1:
+                right -= 1
+                heap.append((self.tree[right], right))
+            left, right = left >> 1, right >> 1
+        heapify(heap)
+        while heap and len(found) < limit:
+            score, node = heappop(heap)
+            if node >= self.size:
+                found.setdefault(score % len(self.entries), None)
+            else:
+                heappush(heap, (self.tree[2 * node], 2 * node))
+                heappush(heap, (self.tree[2 * node + 1], 2 * node + 1))
+
+    def _payload(self, query: str, limit: int) -> Payload:
+        found = {}
+        if query:
+            start = bisect_left(self.keys, query)
+            exact_end = bisect_right(self.keys, query, start)
+            end = bisect_left(self.keys, query[:-1] + chr(ord(query[-1]) + 1), exact_end)
+            self._best(start, exact_end, limit, found)
+            self._best(exact_end, end, limit, found)
+        return make_payload(json_array(self.entries[position] for position in found))
+
+    def suggest(self, term: str, limit: int) -> Payload:
+        """JSON array of the `limit` best schools/faculties for what the user typed so far"""
+        return self.lookup(" ".join(tokenize(term)), limit)
+
+
+def build_suggest_index(db: Session) -> SuggestIndex:
+    return SuggestIndex(
+        db.execute(select(School.id, School.name, School.code)).all(),
+        db.execute(select(Faculty.id, Faculty.name, Faculty.code, Faculty.school_id)).all(),
+    )
+
+
+class SuggestStore:
+    """The database-mode index, rebuilt when the change log moves on; readers never wait for a rebuild"""
+
+    def __init__(self, check_interval: float = SUGGEST_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self.current: Optional[SuggestIndex] = None
+        self.version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def needs_check(self) -> bool:
+        return self.current is None or time.monotonic() - self._checked_at >= self.check_interval
+
+    def expire(self):
+        """Check the change log on the next request (after a write in this process)"""
+        self._checked_at = 0.0
+
+    def check(self, db: Session) -> SuggestIndex:
+        # Non-blocking: in async mode this runs on the event loop thread
+        if not self._lock.acquire(blocking=False):
+            return self.current if self.current is not None else build_suggest_index(db)
+        try:
+            version = latest_version(db)
+            if self.current is None or version != self.version:
+                self.current = build_suggest_index(db)
+                self.version = version
+            self._checked_at = time.monotonic()
+            return self.current
+        finally:
+            self._lock.release()
+
+
+suggest_store = SuggestStore()
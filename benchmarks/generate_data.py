@@ -0,0 +1,144 @@
+"""Generate a synthetic data set in the data/*.json format.
+
+Deterministic for a given --seed, so every run benchmarks the same data.
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+SCHOOL_KINDS = [
+    ("Trường Đại học", "DH"),
+    ("Học viện", "HV"),
+    ("Trường Cao đẳng", "CD"),
+]
+
+FIELDS = [
+    ("Bách khoa", "BK"), ("Kinh tế", "KT"), ("Sư phạm", "SP"), ("Y Dược", "YD"),
+    ("Công nghệ Thông tin", "CNTT"), ("Nông Lâm", "NL"), ("Ngoại thương", "NT"), ("Luật", "L"),
+    ("Khoa học Tự nhiên", "KHTN"), ("Kiến trúc", "KTR"), ("Giao thông Vận tải", "GTVT"),
+    ("Ngân hàng", "NH"), ("Văn hóa", "VH"), ("Thủy lợi", "TL"), ("Mỹ thuật", "MT"),
+]
+
+# (name, code, latitude, longitude)
+CITIES = [
+    ("Hà Nội", "HN", 21.03, 105.85), ("TP.HCM", "HCM", 10.78, 106.70), ("Đà Nẵng", "DN", 16.05, 108.20),
+    ("Huế", "H", 16.46, 107.59), ("Cần Thơ", "CT", 10.03, 105.77), ("Hải Phòng", "HP", 20.86, 106.68),
+    ("Nha Trang", "NT", 12.24, 109.19), ("Vinh", "V", 18.68, 105.68), ("Quy Nhơn", "QN", 13.78, 109.22),
+    ("Thái Nguyên", "TN", 21.59, 105.85), ("Đà Lạt", "DL", 11.94, 108.44), ("Buôn Ma Thuột", "BMT", 12.67, 108.04),
+]
+
+STREETS = [
+    "Lý Thường Kiệt", "Nguyễn Văn Cừ", "Trần Hưng Đạo", "Lê Lợi", "Điện Biên Phủ",
+    "Hai Bà Trưng", "Võ Văn Ngân", "Nguyễn Trãi", "Phạm Văn Đồng", "Lê Duẩn",
+]
+
+FACULTIES = [
+    ("Khoa Cơ khí", "ME", ["Kỹ thuật Cơ khí", "Kỹ thuật Cơ điện tử", "Kỹ thuật Nhiệt"]),
+    ("Khoa Công nghệ Thông tin", "IT", ["Khoa học Máy tính", "Kỹ thuật Phần mềm", "Trí tuệ Nhân tạo"]),
+    ("Khoa Điện - Điện tử", "EE", ["Kỹ thuật Điện", "Kỹ thuật Điện tử - Viễn thông"]),
+    ("Khoa Kinh tế", "EC", ["Kinh tế học", "Kinh tế Quốc tế", "Kinh tế Phát triển"]),
+    ("Khoa Quản trị Kinh doanh", "BA", ["Quản trị Kinh doanh", "Marketing", "Kinh doanh Quốc tế"]),
+    ("Khoa Tài chính - Ngân hàng", "FB", ["Tài chính", "Ngân hàng", "Bảo hiểm"]),
+    ("Khoa Ngoại ngữ", "FL", ["Ngôn ngữ Anh", "Ngôn ngữ Nhật", "Ngôn ngữ Hàn Quốc"]),
+    ("Khoa Luật", "LAW", ["Luật Kinh tế", "Luật Dân sự", "Luật Quốc tế"]),
+    ("Khoa Y", "MED", ["Y khoa", "Răng Hàm Mặt", "Điều dưỡng"]),
+    ("Khoa Dược", "PHA", ["Dược học", "Hóa dược"]),
+    ("Khoa Xây dựng", "CE", ["Kỹ thuật Xây dựng", "Quản lý Xây dựng"]),
+    ("Khoa Hóa học", "CHE", ["Hóa học", "Kỹ thuật Hóa học", "Công nghệ Thực phẩm"]),
+    ("Khoa Sinh học", "BIO", ["Sinh học", "Công nghệ Sinh học"]),
+    ("Khoa Toán - Tin học", "MATH", ["Toán học", "Toán ứng dụng", "Khoa học Dữ liệu"]),
+    ("Khoa Môi trường", "ENV", ["Khoa học Môi trường", "Kỹ thuật Môi trường"]),
+    ("Khoa Kiến trúc", "ARC", ["Kiến trúc", "Quy hoạch Vùng và Đô thị"]),
+]
+
+SCHOOLS_PER_FILE = 1000
+
+
+def make_campus(number: int, rng: random.Random) -> dict:
+    city, _, latitude, longitude = rng.choice(CITIES)
+    return {
+        "name": f"Cơ sở {number + 1}" if number else "Cơ sở chính",
+        "address": f"{rng.randint(1, 500)} {rng.choice(STREETS)}, {city}",
+        "is_main": number == 0,
+        # Scattered within ~15 km of the city centre
+        "latitude": round(latitude + rng.uniform(-0.15, 0.15), 6),
+        "longitude": round(longitude + rng.uniform(-0.15, 0.15), 6),
+    }
+
+
+def make_school(index: int, rng: random.Random) -> dict:
+    kind, kind_code = rng.choice(SCHOOL_KINDS)
+    field, field_code = rng.choice(FIELDS)
+    city, city_code, _, _ = rng.choice(CITIES)
+    school_id = f"{field_code}{city_code}{index}".lower()
+    # String(10) in the schema: short prefix plus the index keeps codes unique
+    code = f"{kind_code}{index}"
+    name = f"{kind} {field} {city} số {index}"
+
+    campuses = [make_campus(number, rng) for number in range(rng.randint(1, 3))]
+    faculties = [
+        {
+            "id": f"{school_id}_{faculty_code.lower()}",
+            "name": faculty_name,
+            "code": faculty_code,
+            "website": None,
+            "programs": programs,
+        }
+        for faculty_name, faculty_code, programs in rng.sample(FACULTIES, rng.randint(3, 10))
+    ]
+    updated = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return {
+        "id": school_id,
+        "code": code,
+        "name": name,
+        "logo_url": None,
+        "description": f"{name} đào tạo các ngành {field.lower()} tại {city}.",
+        "type": rng.choice(["public", "public", "private"]),
+        "country": "VN",
+        "contact": {
+            "website": f"https://www.{school_id}.edu.vn",
+            "email": f"info@{school_id}.edu.vn",
+            "phone": f"+84 {rng.randint(20, 299)} {rng.randint(1000, 9999)} {rng.randint(1000, 9999)}",
+        },
+        "campuses": campuses,
+        "faculties": faculties,
+        "metadata": {
+            "verified": rng.random() < 0.7,
+            "created_at": "2025-01-01",
+            "updated_at": updated,
+        },
+    }
+
+
+def generate(output_dir: str, schools: int, seed: int = 42) -> list:
+    """Write `schools` synthetic schools to output_dir, SCHOOLS_PER_FILE per file; returns their ids"""
+    rng = random.Random(seed)
+    directory = Path(output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    for old in directory.glob("synthetic-*.json"):
+        old.unlink()
+
+    ids = []
+    for start in range(0, schools, SCHOOLS_PER_FILE):
+        batch = [make_school(index, rng) for index in range(start, min(start + SCHOOLS_PER_FILE, schools))]
+        ids.extend(school["id"] for school in batch)
+        path = directory / f"synthetic-{start // SCHOOLS_PER_FILE:03d}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"schools": batch}, f, ensure_ascii=False)
+    return ids
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data/*.json files")
+    parser.add_argument("--schools", type=int, default=1000, help="Number of schools (1k-100k)")
+    parser.add_argument("--output-dir", default="benchmarks/data", help="Directory for the JSON files")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    ids = generate(args.output_dir, args.schools, args.seed)
+    print(f"✅ Generated {len(ids)} schools in '{args.output_dir}/'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Benchmark the importer and every read endpoint against a synthetic data set.
+
+Generates N schools, imports them into a scratch SQLite database, then
+drives the ASGI app in-process (no network, no server) and reports p50/p99
+latency and requests/second per endpoint. Results are written to JSON and
+compared with a baseline from the same data set size; exits with status 1
+when p50, requests/second or the import rate got worse than the tolerance
+allows. Baselines are only comparable on the machine that recorded them:
+release CI measures a pinned reference commit and the release on one runner.
+
+    python benchmarks/run.py --schools 1000                    # compare with baseline
+    python benchmarks/run.py --schools 1000 --update-baseline  # record a new baseline
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+
+from benchmarks.generate_data import generate  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_OUTPUT = ROOT / "benchmarks" / "results.json"
+
+
+# ============= SCENARIOS =============
+
+def _school(rng, ids):
+    return rng.choice(ids)
+
+
+# name -> (method, build(rng, ids) -> (path, query, body), share of --requests)
+SCENARIOS = {
+    "root": ("GET", lambda rng, ids: ("/", "", None), 1),
+    "list_schools": ("GET", lambda rng, ids: ("/api/v1/schools", "limit=100", None), 1),
+    "list_schools_no_children": ("GET", lambda rng, ids: ("/api/v1/schools", "limit=100&include=", None), 1),
+    "list_schools_filtered": (
+        "GET", lambda rng, ids: ("/api/v1/schools", f"type=public&verified=true&skip={rng.randint(0, 200)}", None), 1,
+    ),
+    "list_schools_search": (
+        "GET", lambda rng, ids: ("/api/v1/schools", f"search={rng.choice(['bach khoa', 'kinh te', 'su pham', 'y duoc'])}", None), 1,
+    ),
+    "list_schools_facets": (
+        "GET", lambda rng, ids: ("/api/v1/schools", f"facets=country,type,verified&verified={rng.choice(['true', 'false'])}", None), 1,
+    ),
+    "list_schools_ids": (
+        "GET", lambda rng, ids: ("/api/v1/schools", "ids=" + ",".join(rng.sample(ids, min(20, len(ids)))), None), 1,
+    ),
+    "batch_get_schools": (
+        "POST", lambda rng, ids: ("/api/v1/schools:batchGet", "", {"ids": rng.sample(ids, min(20, len(ids)))}), 1,
+    ),
+    "get_school": ("GET", lambda rng, ids: (f"/api/v1/schools/{_school(rng, ids)}", "", None), 1),
+    "get_school_faculties": ("GET", lambda rng, ids: (f"/api/v1/schools/{_school(rng, ids)}/faculties", "", None), 1),
+    "get_school_campuses": ("GET", lambda rng, ids: (f"/api/v1/schools/{_school(rng, ids)}/campuses", "", None), 1),
+    "list_faculties": ("GET", lambda rng, ids: ("/api/v1/faculties", "limit=100", None), 1),
+    "list_faculties_search": (
+        "GET", lambda rng, ids: ("/api/v1/faculties", f"search={rng.choice(['co khi', 'kinh te', 'luat', 'cong nghe'])}", None), 1,
+    ),
+    "list_faculties_by_school": ("GET", lambda rng, ids: ("/api/v1/faculties", f"school_id={_school(rng, ids)}", None), 1),
+    "list_programs_search": (
+        "GET", lambda rng, ids: ("/api/v1/programs", f"search={rng.choice(['khoa hoc may tinh', 'kinh te', 'ngon ngu', 'ky thuat'])}", None), 1,
+    ),
+    "list_faculties_by_program": (
+        "GET", lambda rng, ids: ("/api/v1/faculties", f"program={rng.choice(['khoa hoc may tinh', 'marketing', 'luat kinh te'])}", None), 1,
+    ),
+    "nearby_campuses": (
+        "GET", lambda rng, ids: ("/api/v1/campuses/nearby", f"lat={rng.uniform(10, 22):.4f}&lon={rng.uniform(105, 109):.4f}&limit=20", None), 1,
+    ),
+    "suggest": (
+        "GET", lambda rng, ids: ("/api/v1/suggest", f"q={rng.choice(['b', 'bach k', 'truong dai', 'kinh te', 'cntt', 'hcm'])}", None), 1,
+    ),
+    "stats": ("GET", lambda rng, ids: ("/api/v1/stats", "", None), 1),
+    "changes": ("GET", lambda rng, ids: ("/api/v1/changes", f"since={rng.randint(0, len(ids))}", None), 1),
+    "export": ("GET", lambda rng, ids: ("/api/v1/export", "", None), 0.02),
+}
+
+
+# ============= ASGI DRIVER =============
+
+async def call(app, method: str, path: str, query: str = "", body=None) -> int:
+    """Run one request through the ASGI app and return the status code; the body is discarded"""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = [(b"host", b"bench"), (b"accept-encoding", b"identity")]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"), "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+    status = 0
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Never disconnect; streaming responses cancel this when they finish
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+async def run_scenario(app, method, build, ids, requests: int, concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        await call(app, method, *build(rng, ids))
+
+    latencies, errors = [], []
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            status = await call(app, method, *build(rng, ids))
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 3),
+    }
+
+
+# ============= RUN =============
+
+def benchmark_import(data_dir: str) -> dict:
+    from scripts.import_data import import_all_schools
+    from app.database import engine
+    from sqlalchemy import text
+
+    results = {}
+    for name, incremental in (("import_full", False), ("import_incremental_noop", True)):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_all_schools(data_dir, incremental=incremental)
+        results[name] = {"seconds": round(time.perf_counter() - started, 3)}
+
+    with engine.connect() as conn:
+        rows = sum(conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+                   for table in ("schools", "campuses", "faculties"))
+    results["import_full"]["rows"] = rows
+    results["import_full"]["rows_per_second"] = round(rows / results["import_full"]["seconds"], 1)
+    return results
+
+
+async def benchmark_endpoints(ids: list, requests: int, concurrency: int, warmup: int, only) -> dict:
+    from app.main import app
+    from app.rate_limiter import limiter
+
+    # Measure the endpoints, not the 429 path
+    limiter.enabled = False
+
+    results = {}
+    # Startup (schema upgrade, warm-up) as a server would run it, outside the measurements
+    async with app.router.lifespan_context(app):
+        for position, (name, (method, build, share)) in enumerate(SCENARIOS.items()):
+            if only and name not in only:
+                continue
+            count = max(5, int(requests * share))
+            results[name] = await run_scenario(
+                app, method, build, ids, count, concurrency, min(warmup, count), seed=position
+            )
+            row = results[name]
+            print(f"   {name:<28} p50 {row['p50_ms']:>9.3f} ms   p99 {row['p99_ms']:>9.3f} ms   "
+                  f"{row['rps']:>9.1f} req/s" + (f"   ❌ {row['errors']} errors" if row["errors"] else ""))
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> tuple:
+    """(regressions, p99 slowdowns): metrics worse than the baseline by more than `tolerance`.
+
+    p99 over a few hundred requests moves 2-3x between runs of the same code,
+    so its slowdowns are reported but don't fail the check.
+    """
+    regressions, slowdowns = [], []
+    slack = 1 + tolerance
+    for name, current in results["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if current["p50_ms"] > previous["p50_ms"] * slack:
+            regressions.append(f"{name} p50_ms: {previous['p50_ms']} -> {current['p50_ms']}")
+        if current["rps"] * slack < previous["rps"]:
+            regressions.append(f"{name} rps: {previous['rps']} -> {current['rps']}")
+        if current["p99_ms"] > previous["p99_ms"] * slack:
+            slowdowns.append(f"{name} p99_ms: {previous['p99_ms']} -> {current['p99_ms']}")
+
+    previous = baseline.get("import", {}).get("import_full", {}).get("rows_per_second")
+    current = results["import"]["import_full"]["rows_per_second"]
+    if previous and current * slack < previous:
+        regressions.append(f"import rows/s: {previous} -> {current}")
+    return regressions, slowdowns
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the importer and API endpoints")
+    parser.add_argument("--schools", type=int, default=1000, help="Synthetic data set size (1k-100k)")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per endpoint")
+    parser.add_argument("--only", nargs="*", help="Only these endpoints (see SCENARIOS)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown, 0.3 = 30%%")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the baseline")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="schools-bench-")
+    # Must be set before anything imports app.database
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+
+    print(f"🧪 Generating {args.schools} schools...")
+    ids = generate(f"{workdir}/data", args.schools, args.seed)
+
+    print("📥 Importing...")
+    import_results = benchmark_import(f"{workdir}/data")
+    full = import_results["import_full"]
+    print(f"   {full['rows']} rows in {full['seconds']}s ({full['rows_per_second']:,.0f} rows/s), "
+          f"incremental no-op in {import_results['import_incremental_noop']['seconds']}s")
+
+    print(f"🚀 Endpoints ({args.requests} requests, concurrency {args.concurrency}):")
+    endpoints = asyncio.run(benchmark_endpoints(ids, args.requests, args.concurrency, args.warmup, args.only))
+
+    results = {
+        "schools": args.schools,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "import": import_results,
+        "endpoints": endpoints,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n📝 Results written to {args.output}")
+
+    if any(row["errors"] for row in endpoints.values()):
+        print("❌ Some requests failed")
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  No baseline yet; run with --update-baseline to record one")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    settings = ("schools", "requests", "concurrency")
+    if any(baseline.get(name) != results[name] for name in settings):
+        recorded = ", ".join(f"{name}={baseline.get(name)}" for name in settings)
+        print(f"⚠️  Baseline was recorded with {recorded}; not comparing")
+        return 0
+
+    regressions, slowdowns = compare(results, baseline, args.tolerance)
+    if slowdowns:
+        print(f"⚠️  p99 beyond {args.tolerance:.0%} (not enforced, too noisy):")
+        for slowdown in slowdowns:
+            print(f"   • {slowdown}")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"   • {regression}")
+        return 1
+    print(f"✅ No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
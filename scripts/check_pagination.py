@@ -0,0 +1,135 @@
+"""Fail when following X-Next-Cursor through a list endpoint loses, repeats or rejects rows.
+
+Imports data/*.json into a scratch SQLite database, then drives the ASGI app
+in-process. For every list endpoint (with and without search) it walks the
+pages with a small `limit`, following each X-Next-Cursor, and compares the
+ids with a single-page listing of the same query. With --snapshot the same
+walk runs against the in-memory snapshot instead of the database.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).parent.parent
+# Add parent directory to path
+sys.path.insert(0, str(ROOT))
+
+# Rows per page while walking; small, so every query spans several pages
+PAGE_SIZE = 2
+
+# (path, query) pairs, one per list endpoint and ordering
+QUERIES = [
+    ("/api/v1/schools", {}),
+    ("/api/v1/schools", {"search": "dai hoc"}),
+    ("/api/v1/faculties", {}),
+    ("/api/v1/faculties", {"search": "cong nghe"}),
+    ("/api/v1/programs", {}),
+    ("/api/v1/programs", {"search": "ky thuat"}),
+]
+
+
+async def get(app, path: str, query: dict):
+    """Run one GET through the app; returns (status, headers, JSON body)"""
+    query_string = urlencode(query).encode("utf-8")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "app": app,
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode("utf-8"),
+        "query_string": query_string, "root_path": "", "headers": [(b"host", b"check")],
+        "client": ("127.0.0.1", 0), "server": ("check", 80),
+    }
+    status, headers, body = 500, {}, b""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, headers, body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in message["headers"]}
+        elif message["type"] == "http.response.body":
+            body += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return status, headers, json.loads(body) if body else None
+
+
+async def walk(app, path: str, query: dict) -> list:
+    """Describe every problem found paging through one query"""
+    status, _, everything = await get(app, path, {**query, "limit": 500})
+    if status != 200:
+        return [f"single page returned {status}"]
+    expected = [row["id"] for row in everything]
+    if len(expected) <= PAGE_SIZE:
+        return [f"only {len(expected)} rows, too few to page through"]
+
+    seen, pages, cursor = [], 0, None
+    while True:
+        page = {**query, "limit": PAGE_SIZE}
+        if cursor:
+            page["cursor"] = cursor
+        status, headers, rows = await get(app, path, page)
+        if status != 200:
+            return [f"page {pages + 1} returned {status}: {rows}"]
+        pages += 1
+        seen += [row["id"] for row in rows]
+        cursor = headers.get("x-next-cursor")
+        if cursor is None or pages > len(expected):
+            break
+
+    problems = []
+    if seen != expected:
+        problems.append(f"paged ids {seen} != single page {expected}")
+    if pages < 2:
+        problems.append("never reached page 2")
+    return problems
+
+
+async def check() -> int:
+    from app.main import app
+    from app.rate_limiter import limiter
+
+    limiter.enabled = False
+    failures = 0
+    async with app.router.lifespan_context(app):
+        for path, query in QUERIES:
+            problems = await walk(app, path, query)
+            label = f"GET {path}" + (f"?{urlencode(query)}" if query else "")
+            print(f"{'❌' if problems else '✅'} {label}" + (f": {'; '.join(problems)}" if problems else ""))
+            failures += bool(problems)
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check cursor pagination of the list endpoints")
+    parser.add_argument("--data-dir", default=str(ROOT / "data"), help="Directory of data/*.json files to import")
+    parser.add_argument("--snapshot", action="store_true", help="Answer from the in-memory snapshot (SNAPSHOT_MODE)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Must be set before anything imports app.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/pagination.db"
+        os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+        os.environ["SNAPSHOT_MODE"] = "1" if args.snapshot else "0"
+
+        from scripts.import_data import import_all_schools
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_all_schools(args.data_dir)
+        failures = asyncio.run(check())
+
+    if failures:
+        print(f"\n❌ {failures} quer{'y' if failures == 1 else 'ies'} page incorrectly")
+        return 1
+    print("\n✅ Every cursor leads to the next page")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
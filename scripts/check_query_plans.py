@@ -0,0 +1,244 @@
+"""Fail when an API request plans a full scan or a sort of schools/campuses/faculties/programs.
+
+Runs every request in REQUESTS through the app in-process, against
+data/*.json imported into a scratch database, and records the statements
+the endpoints actually send with a `before_cursor_execute` hook. Each one is
+then planned with EXPLAIN QUERY PLAN. By default the plans come from a fresh
+schema created by the migrations, without planner statistics, so the result
+depends only on the schema; with --database-url an existing database is
+migrated and planned instead, and statistics gathered on a tiny data set may
+legitimately prefer scans there.
+
+A plan fails when it scans a checked table ("SCAN <table>", through an index
+or not) or sorts in a temp B-tree, unless the request allows that: whole
+catalog reads, rank-ordered search results, and unfiltered lists walking the
+primary key until their LIMIT. Exits with status 1 on any failure.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+# Add parent directory to path
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, event, text
+
+# Full scans of these tables are regressions; FTS and R*Tree virtual tables are not checked
+CHECKED_TABLES = {"schools", "campuses", "faculties", "programs"}
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_SORT_RE = re.compile(r"^USE TEMP B-TREE")
+# Statements worth planning; inserts and schema/pragma traffic are not
+_PLANNED_RE = re.compile(r"^\s*(SELECT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+# Allowances: "scan" a checked table (whole-table reads, or the primary key walked up to LIMIT),
+# "sort" in a temp B-tree (results ordered by search rank)
+SCAN, SORT = "scan", "sort"
+# school id with a cursor from the first page of a filtered list
+CURSOR_ID = "hcmut"
+
+
+def _document(school_id: str, **changes):
+    return lambda documents: {**documents[school_id], **changes}
+
+
+# (method, path, body or body(documents), allowances); writes last, they change the data
+REQUESTS = [
+    ("GET", "/api/v1/schools", None, {SCAN}),
+    ("GET", "/api/v1/schools?include=", None, {SCAN}),
+    ("GET", "/api/v1/schools?code=HCMUT", None, set()),
+    ("GET", "/api/v1/schools?country=VN", None, set()),
+    ("GET", "/api/v1/schools?country=VN&type=public", None, set()),
+    ("GET", "/api/v1/schools?country=VN&type=public&verified=true", None, set()),
+    ("GET", "/api/v1/schools?country=VN&verified=true", None, set()),
+    ("GET", "/api/v1/schools?type=public", None, set()),
+    ("GET", "/api/v1/schools?type=public&verified=true", None, set()),
+    ("GET", "/api/v1/schools?verified=true", None, set()),
+    ("GET", "/api/v1/schools?country=VN&type=private&cursor={cursor}", None, set()),
+    ("GET", "/api/v1/schools?search=dai+hoc", None, {SORT}),
+    ("GET", "/api/v1/schools?facets=country,type,verified", None, {SCAN, SORT}),
+    ("GET", "/api/v1/schools?ids=hcmut,stu", None, set()),
+    ("POST", "/api/v1/schools:batchGet", {"ids": ["hcmut", "stu"]}, set()),
+    ("GET", "/api/v1/schools/hcmut", None, set()),
+    ("GET", "/api/v1/schools/hcmut/faculties", None, set()),
+    ("GET", "/api/v1/schools/hcmut/campuses", None, set()),
+    ("GET", "/api/v1/faculties", None, {SCAN}),
+    # Sorts one school's faculties only; the plain school_id index keeps them in file order for /schools/{id}/faculties
+    ("GET", "/api/v1/faculties?school_id=hcmut", None, {SORT}),
+    ("GET", "/api/v1/faculties?search=cong+nghe", None, {SORT}),
+    ("GET", "/api/v1/faculties?program=ky+thuat", None, set()),
+    ("POST", "/api/v1/faculties:batchGet", {"ids": ["hcmut_me", "stu_it"]}, set()),
+    ("GET", "/api/v1/faculties/hcmut_me", None, set()),
+    ("GET", "/api/v1/campuses/nearby?lat=10.77&lon=106.66&limit=5", None, set()),
+    ("GET", "/api/v1/programs", None, {SCAN}),
+    ("GET", "/api/v1/programs?school_id=hcmut", None, set()),
+    ("GET", "/api/v1/programs?search=ky+thuat", None, {SORT}),
+    ("GET", "/api/v1/changes?since=5", None, set()),
+    # Whole catalog by design: an in-memory index, counts, the dump
+    ("GET", "/api/v1/suggest?q=bk", None, {SCAN}),
+    ("GET", "/api/v1/stats", None, {SCAN, SORT}),
+    ("GET", "/api/v1/export", None, {SCAN}),
+    ("PUT", "/api/v1/schools/hcmut", _document("hcmut", name="Trường Đại học Bách khoa TP.HCM"), set()),
+    ("POST", "/api/v1/schools:bulkUpsert",
+     lambda documents: {"schools": [documents["stu"], {**documents["vlu"], "name": "Trường Đại học Văn Lang (VLU)"}]},
+     set()),
+    ("DELETE", "/api/v1/schools/hiu", None, set()),
+]
+
+
+# ============= CAPTURE =============
+
+async def send_request(app, method: str, path: str, body=None) -> int:
+    """Run one request through the router (no middleware); returns the status"""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = [(b"host", b"check")]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "app": app,
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"), "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 0), "server": ("check", 80),
+    }
+    status = 500
+    messages = [{"type": "http.request", "body": payload, "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Streaming responses listen for a disconnect until they are done
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app.router(scope, receive, send)
+    return status
+
+
+async def capture(documents: dict) -> list:
+    """[(request, status, [(sql, parameters)])] for every request in REQUESTS"""
+    from app.database import engine
+    from app.main import app
+    from app.pagination import encode_cursor
+    from app.rate_limiter import limiter
+
+    limiter.enabled = False
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if _PLANNED_RE.match(statement) and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    captured = []
+    try:
+        for method, path, body, allowed in REQUESTS:
+            path = path.format(cursor=encode_cursor({"id": CURSOR_ID}))
+            statements = []
+            status = await send_request(app, method, path, body(documents) if callable(body) else body)
+            captured.append(((method, path, allowed), status, statements))
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return captured
+
+
+# ============= PLANS =============
+
+def query_plan(conn, statement: str, parameters) -> list:
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def plan_problems(plan: list, allowed: set) -> list:
+    problems = []
+    for detail in plan:
+        match = _SCAN_RE.match(detail)
+        if match and match.group(1) in CHECKED_TABLES and SCAN not in allowed:
+            problems.append(detail)
+        elif _SORT_RE.match(detail) and SORT not in allowed:
+            problems.append(detail)
+    return problems
+
+
+def check(captured: list, database_url: str, verbose: bool = False) -> int:
+    """Print every request's plans; return the number of requests with a failing plan"""
+    from app.database import engine_options, set_sqlite_pragmas
+    from app.migrations import upgrade
+
+    engine = create_engine(database_url, **engine_options(database_url))
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    upgrade(engine)
+
+    failures = 0
+    with engine.connect() as conn:
+        # EXPLAIN alone doesn't reload a schema changed by another connection
+        conn.execute(text("SELECT count(*) FROM sqlite_master"))
+        for (method, path, allowed), status, statements in captured:
+            problems, plans = [], []
+            if status >= 400:
+                problems.append(f"returned {status}")
+            for statement, parameters in dict.fromkeys(statements):
+                plan = query_plan(conn, statement, parameters)
+                plans.append(plan)
+                problems += plan_problems(plan, allowed)
+            print(f"{'❌' if problems else '✅'} {method} {path} ({len(statements)} statements)")
+            for problem in dict.fromkeys(problems):
+                print(f"     {problem}")
+            if verbose or problems:
+                for (statement, _), plan in zip(dict.fromkeys(statements), plans):
+                    print(f"     {' '.join(statement.split())[:160]}\n       -> {' | '.join(plan)}")
+            failures += bool(problems)
+    engine.dispose()
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check that API queries use indexes")
+    parser.add_argument("--database-url", help="Existing SQLite database to check (default: fresh schema)")
+    parser.add_argument("--data-dir", default=str(ROOT / "data"), help="Directory of data/*.json files to import")
+    parser.add_argument("--verbose", action="store_true", help="Print every statement and its plan")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Must be set before anything imports app.database
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/capture.db"
+        os.environ["DATABASE_ASYNC"] = "0"
+        os.environ["SNAPSHOT_MODE"] = "0"
+        os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+
+        from app.database import is_sqlite
+        from scripts.import_data import import_all_schools
+
+        if args.database_url and not is_sqlite(args.database_url):
+            print("⚠️  Query plan checks only support SQLite")
+            return 0
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            import_all_schools(args.data_dir)
+        documents = {}
+        for path in sorted(Path(args.data_dir).glob("*.json")):
+            with open(path, encoding="utf-8") as f:
+                documents.update((school["id"], school) for school in json.load(f)["schools"])
+
+        captured = asyncio.run(capture(documents))
+        failures = check(captured, args.database_url or f"sqlite:///{directory}/schema.db", args.verbose)
+
+    if failures:
+        print(f"\n❌ {failures} request{'s' if failures > 1 else ''} scan or sort a whole table")
+        return 1
+    print("\n✅ Every query uses an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Fail when a rate limit storage miscounts or a spoofed CF-Connecting-IP escapes the limits.
+
+For every storage URI it runs each supported strategy through one small
+limit: the hits up to the limit pass, the next one is rejected, other keys
+are unaffected, and a second client of the same storage (another worker)
+sees the same counters. It then sends requests through the app with a
+rotating CF-Connecting-IP: from an untrusted peer they must still be
+limited, from the local tunnel each header is its own client.
+
+By default it checks memory:// and a scratch sqlite:/// file. --fake-redis
+adds the Redis backend against an in-process stand-in (`pip install redis
+"fakeredis[lua]"`), no server needed; --storage-uri checks real ones.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+# Small enough to hit quickly, large enough to show counting
+LIMIT = "5/minute"
+# Storages keeping counters in the process; a second client cannot share them
+PER_PROCESS_SCHEMES = ("memory",)
+
+
+def check_storage(uri: str, **options) -> list:
+    """Describe every miscount of each strategy the storage supports"""
+    problems = []
+    item = parse(LIMIT)
+    for name, strategy_class in STRATEGIES.items():
+        storage = storage_from_string(uri, **options)
+        try:
+            limiter = strategy_class(storage)
+        except NotImplementedError:
+            continue
+        storage.reset()
+        key = ("check", name)
+        allowed = [limiter.hit(item, *key) for _ in range(item.amount)]
+        if not all(allowed):
+            problems.append(f"{name}: hit {allowed.index(False) + 1} of {item.amount} rejected")
+        if limiter.hit(item, *key):
+            problems.append(f"{name}: hit {item.amount + 1} allowed")
+        if not limiter.hit(item, "check", f"{name}-other"):
+            problems.append(f"{name}: another key shares the counter")
+        if not uri.startswith(PER_PROCESS_SCHEMES):
+            # A separate client of the same storage, as in another worker
+            if strategy_class(storage_from_string(uri, **options)).test(item, *key):
+                problems.append(f"{name}: counters not shared between clients")
+        storage.reset()
+    return problems
+
+
+async def get_faculties(app, peer: str, count: int) -> list:
+    """Send `count` requests from `peer`, each with a new CF-Connecting-IP; returns the statuses"""
+    statuses = []
+    for position in range(count):
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "app": app,
+            "method": "GET", "scheme": "http", "path": "/api/v1/faculties", "raw_path": b"/api/v1/faculties",
+            "query_string": b"", "root_path": "",
+            "headers": [(b"host", b"check"), (b"cf-connecting-ip", f"198.51.100.{position % 250}".encode())],
+            "client": (peer, 40000), "server": ("check", 80),
+        }
+        status = 500
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await app(scope, receive, send)
+        statuses.append(status)
+    return statuses
+
+
+async def check_client_keys(count: int) -> list:
+    """CF-Connecting-IP is one bucket per client from the local tunnel, and ignored from anyone else"""
+    from app.main import app
+    from app.rate_limiter import RateLimits
+
+    problems = []
+    async with app.router.lifespan_context(app):
+        statuses = await get_faculties(app, "203.0.113.7", count)
+        if 429 not in statuses:
+            problems.append(f"untrusted peer: {count} requests against {RateLimits.SEARCH}, none rejected")
+        statuses = await get_faculties(app, "127.0.0.1", count)
+        if set(statuses) != {200}:
+            problems.append(f"trusted proxy: clients share a bucket ({statuses.count(429)} rejected)")
+    return problems
+
+
+def fake_redis_options() -> dict:
+    """Storage options pointing the Redis client at an in-process stand-in server.
+
+    The redis client, its command encoding and the limits Lua scripts all run
+    as they would against a real server; fakeredis answers instead of a socket.
+    """
+    from fakeredis import FakeConnection, FakeServer
+
+    return {"connection_class": FakeConnection, "server": FakeServer()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check rate limit storages and client keys")
+    parser.add_argument("--storage-uri", action="append", default=[],
+                        help="Also check this storage (repeatable; its counters are reset)")
+    parser.add_argument("--fake-redis", action="store_true", help="Also check the Redis backend against a local stand-in")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Must be set before anything imports app.database or app.rate_limiter;
+        # trusted proxies keep their default (loopback)
+        os.environ["DATABASE_URL"] = f"sqlite:///{directory}/ratelimit-app.db"
+        os.environ["RATE_LIMIT_STORAGE_URI"] = "memory://"
+        os.environ["RATE_LIMIT_TRUST_CF"] = "1"
+        os.environ.pop("RATE_LIMIT_TRUSTED_PROXIES", None)
+        # Registers the sqlite:/// storage with limits
+        from app.rate_limiter import SQLiteStorage  # noqa: F401
+
+        storages = [("memory://", {}), (f"sqlite:///{directory}/ratelimit.db", {})]
+        storages += [(uri, {}) for uri in args.storage_uri]
+        if args.fake_redis:
+            try:
+                storages.append(("redis://localhost:6379/0", fake_redis_options()))
+            except ImportError:
+                print('⚠️  Redis stand-in needs `pip install redis "fakeredis[lua]"`, skipping it')
+
+        failures = 0
+        for uri, options in storages:
+            problems = check_storage(uri, **options)
+            label = uri + (" (fakeredis)" if options else "")
+            print(f"{'❌' if problems else '✅'} {label}" + (f": {'; '.join(problems)}" if problems else ""))
+            failures += bool(problems)
+
+        problems = asyncio.run(check_client_keys(60))
+        print(f"{'❌' if problems else '✅'} CF-Connecting-IP client keys" + (f": {'; '.join(problems)}" if problems else ""))
+        failures += bool(problems)
+
+    if failures:
+        print(f"\n❌ {failures} rate limit check{'s' if failures > 1 else ''} failed")
+        return 1
+    print("\n✅ Rate limits hold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
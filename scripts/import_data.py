@@ -1,24 +1,41 @@
+import argparse
 import json
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import glob
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.database import SessionLocal, engine
-from app.models import Base, School, Campus, Faculty
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session, selectinload
 
+from app.bulk import DEFAULT_BATCH_SIZE, delete_schools, insert_documents, update_documents
+from app.changes import record_changes
+from app.database import engine
+from app.documents import fingerprint, normalize_document, school_to_document
+from app.migrations import upgrade
+from app.models import School, Campus, Faculty, Program
+
+
+def import_schools_from_file(json_file: str):
+    """Parse and validate a single JSON file.
+
+    Pure function (no database access) so several files can be parsed in a
+    process pool. Returns (documents, messages, ok).
+    """
+    messages = [f"\n📄 Processing file: {json_file}"]
 
-def import_schools_from_file(db, json_file: str):
-    """Import schools from a single JSON file"""
-    
-    print(f"\n📄 Processing file: {json_file}")
-    
     # Load JSON data
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
+    try:
+        with open(json_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        messages.append(f"   ❌ Error: Invalid JSON in {json_file}: {e}")
+        return [], messages, False
+
     # Support both formats
     if isinstance(data, dict) and 'schools' in data:
         # Format: {"schools": [...]}
@@ -27,159 +44,177 @@ def import_schools_from_file(db, json_file: str):
         # Format: [...]
         schools_data = data
     else:
-        print(f"⚠️  Skipping {json_file}: Invalid format (expected array or object with 'schools' key)")
-        return 0, 0, 0
-    
+        messages.append(f"⚠️  Skipping {json_file}: Invalid format (expected array or object with 'schools' key)")
+        return [], messages, False
+
     # Check if data is empty
     if not schools_data:
-        print(f"   ℹ️  File is empty, skipping...")
-        return 0, 0, 0
-    
-    schools_count = 0
-    campuses_count = 0
-    faculties_count = 0
-    
-    # Import schools
+        messages.append("   ℹ️  File is empty, skipping...")
+        return [], messages, True
+
+    documents = []
     for school_data in schools_data:
         try:
-            print(f"   → Importing: {school_data['name']}")
-            
-            # Check if school already exists
-            existing_school = db.query(School).filter(School.id == school_data['id']).first()
-            if existing_school:
-                print(f"      ⚠️  School '{school_data['id']}' already exists, skipping...")
-                continue
-            
-            # Create school
-            school = School(
-                id=school_data['id'],
-                code=school_data['code'],
-                name=school_data['name'],
-                logo_url=school_data.get('logo_url'),
-                description=school_data['description'],
-                type=school_data['type'],
-                country=school_data['country'],
-                contact=school_data['contact'],
-                verified=school_data['metadata']['verified'],
-                created_at=school_data['metadata']['created_at'],
-                updated_at=school_data['metadata']['updated_at']
-            )
-            db.add(school)
-            db.flush()
-            schools_count += 1
-            
-            # Create campuses
-            for campus_data in school_data.get('campuses', []):
-                campus = Campus(
-                    school_id=school_data['id'],
-                    name=campus_data['name'],
-                    address=campus_data['address'],
-                    is_main=campus_data.get('is_main', False)
-                )
-                db.add(campus)
-                campuses_count += 1
-            
-            # Create faculties
-            for faculty_data in school_data.get('faculties', []):
-                faculty = Faculty(
-                    id=faculty_data['id'],
-                    school_id=school_data['id'],
-                    name=faculty_data['name'],
-                    code=faculty_data.get('code'),
-                    website=faculty_data.get('website'),
-                    programs=faculty_data.get('programs', [])
-                )
-                db.add(faculty)
-                faculties_count += 1
-            
+            documents.append(normalize_document(school_data))
         except KeyError as e:
-            print(f"      ❌ Error: Missing required field {e} in school data")
+            messages.append(f"      ❌ Error: Missing required field {e} in school '{school_data.get('id', '?')}'")
+        except (TypeError, AttributeError, ValueError) as e:
+            messages.append(f"      ❌ Error: Invalid school data '{school_data.get('id', '?')}': {e}")
+
+    return documents, messages, True
+
+
+def parse_files(json_files: list, workers: int):
+    """Parse all files, in a process pool when there is more than one file and worker"""
+    if workers > 1 and len(json_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(import_schools_from_file, json_files))
+    return [import_schools_from_file(json_file) for json_file in json_files]
+
+
+def deduplicate(documents: list):
+    """Keep the first school per id/code and drop schools whose faculty ids are already taken"""
+    seen_ids, seen_codes, seen_faculties = set(), set(), set()
+    unique = []
+    for doc in documents:
+        faculty_ids = [faculty["id"] for faculty in doc["faculties"]]
+        if doc["id"] in seen_ids:
+            print(f"      ⚠️  School '{doc['id']}' already exists, skipping...")
+            continue
+        if doc["code"] in seen_codes:
+            print(f"      ⚠️  School code '{doc['code']}' of '{doc['id']}' already used, skipping...")
             continue
-        except Exception as e:
-            print(f"      ❌ Error importing school: {e}")
+        clashes = seen_faculties.intersection(faculty_ids)
+        if clashes or len(set(faculty_ids)) != len(faculty_ids):
+            print(f"      ⚠️  Duplicate faculty id(s) in '{doc['id']}': {', '.join(sorted(clashes)) or 'within school'}, skipping...")
             continue
-    
-    return schools_count, campuses_count, faculties_count
+        seen_ids.add(doc["id"])
+        seen_codes.add(doc["code"])
+        seen_faculties.update(faculty_ids)
+        unique.append(doc)
+    return unique
+
+
+def changed_documents(conn, documents: list):
+    """Split file documents into (new_or_changed, unchanged_ids, removed_ids) against the database"""
+    with Session(bind=conn) as session:
+        current = {
+            school.id: fingerprint(school_to_document(school))
+            for school in session.scalars(
+                select(School).options(selectinload(School.campuses), selectinload(School.faculties))
+            )
+        }
+
+    changed = [doc for doc in documents if current.get(doc["id"]) != fingerprint(doc)]
+    incoming = {doc["id"] for doc in documents}
+    removed = sorted(set(current) - incoming)
+    return changed, len(documents) - len(changed), removed
 
 
-def import_all_schools(data_dir: str = "data"):
+def import_all_schools(data_dir: str = "data", incremental: bool = False,
+                       workers: int = 1, batch_size: int = DEFAULT_BATCH_SIZE):
     """Import schools from all JSON files in data directory"""
-    
+
     print("="*60)
-    print("🎓 Schools API - Data Import")
+    print("🎓 Schools API - Data Import" + (" (incremental)" if incremental else ""))
     print("="*60)
-    
+
     # Create tables
     print("\n📊 Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    
+    upgrade(engine)
+
     # Find all JSON files in data directory
-    json_files = glob.glob(f"{data_dir}/*.json")
-    
+    json_files = sorted(glob.glob(f"{data_dir}/*.json"))
+
     if not json_files:
         print(f"\n⚠️  No JSON files found in '{data_dir}/' directory")
         return
-    
+
     print(f"\n📁 Found {len(json_files)} JSON file(s) in '{data_dir}/':")
     for f in json_files:
         print(f"   - {f}")
-    
-    db = SessionLocal()
-    
+
+    started = time.perf_counter()
+
+    documents = []
+    all_files_ok = True
+    for file_documents, messages, ok in parse_files(json_files, workers):
+        print("\n".join(messages))
+        if file_documents:
+            print(f"   ✅ Parsed {len(file_documents)} schools")
+        documents.extend(file_documents)
+        all_files_ok = all_files_ok and ok
+    documents = deduplicate(documents)
+    parsed = time.perf_counter()
+
     try:
-        # Clear existing data
-        print(f"\n🗑️  Clearing existing data...")
-        db.query(Faculty).delete()
-        db.query(Campus).delete()
-        db.query(School).delete()
-        db.commit()
-        print("   ✅ Database cleared")
-        
-        total_schools = 0
-        total_campuses = 0
-        total_faculties = 0
-        
-        # Import from each JSON file
-        for json_file in sorted(json_files):
-            try:
-                schools, campuses, faculties = import_schools_from_file(db, json_file)
-                total_schools += schools
-                total_campuses += campuses
-                total_faculties += faculties
-                
-                if schools > 0:
-                    print(f"   ✅ Imported {schools} schools, {campuses} campuses, {faculties} faculties")
-                
-            except json.JSONDecodeError as e:
-                print(f"   ❌ Error: Invalid JSON in {json_file}: {e}")
-                continue
-            except Exception as e:
-                print(f"   ❌ Error processing {json_file}: {e}")
-                continue
-        
-        # Commit all changes
-        db.commit()
-        
-        print("\n" + "="*60)
-        if total_schools > 0:
-            print("✅ Import completed successfully!")
-            print(f"📊 Total imported:")
-            print(f"   • {total_schools} schools")
-            print(f"   • {total_campuses} campuses")
-            print(f"   • {total_faculties} faculties")
-        else:
-            print("⚠️  No schools were imported")
-            print("   Database is empty and ready for contributions!")
-        print("="*60)
-        
+        # One transaction: readers keep seeing the previous data set until commit,
+        # and any failure leaves the live database untouched
+        with engine.begin() as conn:
+            if incremental:
+                documents, unchanged, removed = changed_documents(conn, documents)
+                if removed and not all_files_ok:
+                    print(f"\n⚠️  Some files failed to load, keeping {len(removed)} school(s) missing from the data")
+                    removed = []
+                print(f"\n🔎 {len(documents)} new/changed, {unchanged} unchanged, {len(removed)} removed")
+                changed_ids = [doc["id"] for doc in documents]
+                existing = set(conn.execute(select(School.id)).scalars())
+                delete_schools(conn, removed, batch_size)
+                counts = update_documents(conn, [doc for doc in documents if doc["id"] in existing], batch_size)
+                documents = [doc for doc in documents if doc["id"] not in existing]
+            else:
+                print("\n🗑️  Replacing existing data...")
+                changed_ids = [doc["id"] for doc in documents]
+                existing = set(conn.execute(select(School.id)).scalars())
+                removed = sorted(existing - {doc["id"] for doc in documents})
+                conn.execute(delete(Program.__table__))
+                conn.execute(delete(Faculty.__table__))
+                conn.execute(delete(Campus.__table__))
+                conn.execute(delete(School.__table__))
+                counts = (0, 0, 0)
+
+            inserted = insert_documents(conn, documents, batch_size)
+            total_schools, total_campuses, total_faculties = (a + b for a, b in zip(counts, inserted))
+            # Full imports rewrite every school, so every school is logged as changed
+            record_changes(conn, changed_ids + removed)
+
     except Exception as e:
-        print(f"\n❌ Fatal error during import: {e}")
-        db.rollback()
+        print(f"\n❌ Fatal error during import, database left unchanged: {e}")
         raise
-    
-    finally:
-        db.close()
+
+    finished = time.perf_counter()
+    total_rows = total_schools + total_campuses + total_faculties
+    load_seconds = max(finished - parsed, 1e-9)
+
+    print("\n" + "="*60)
+    if total_schools > 0:
+        print("✅ Import completed successfully!")
+        print("📊 Total imported:")
+        print(f"   • {total_schools} schools")
+        print(f"   • {total_campuses} campuses")
+        print(f"   • {total_faculties} faculties")
+    elif incremental:
+        print("✅ Database already up to date")
+    else:
+        print("⚠️  No schools were imported")
+        print("   Database is empty and ready for contributions!")
+    print(f"⏱️  Parsed in {parsed - started:.3f}s, loaded in {finished - parsed:.3f}s "
+          f"({total_rows / load_seconds:,.0f} rows/s)")
+    print("="*60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import data/*.json into the database")
+    parser.add_argument("--data-dir", default="data", help="Directory containing the JSON files")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rewrite new/changed schools and delete removed ones")
+    parser.add_argument("--workers", type=int, default=1, help="Processes used to parse JSON files")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rows per INSERT batch")
+    args = parser.parse_args(argv)
+
+    import_all_schools(args.data_dir, incremental=args.incremental,
+                       workers=args.workers, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
-    import_all_schools()
\ No newline at end of file
+    main()